@@ -1,10 +1,21 @@
-from flask import Flask, render_template, request, redirect, url_for, send_from_directory
+from flask import Flask, Response, abort, render_template, request, redirect, url_for, send_from_directory, send_file, stream_template
+from flask_caching import Cache
 import sqlite3
+import click
+import io
+import logging
 import os
+import queue
+import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from werkzeug.security import safe_join
 from werkzeug.utils import secure_filename
-import pandas as pd
 from datetime import datetime
 
+logger = logging.getLogger(__name__)
+
 app = Flask(__name__)
 
 UPLOAD_FOLDER = 'uploads'
@@ -12,11 +23,73 @@ if not os.path.exists(UPLOAD_FOLDER):
     os.makedirs(UPLOAD_FOLDER)
 
 app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
+app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max upload size
+
+# Delegar la entrega de archivos al servidor web frontal: Apache/lighttpd con
+# USE_X_SENDFILE=1, o nginx indicando la ubicación interna en X_ACCEL_REDIRECT
+# (por ejemplo "/protected/")
+app.config['USE_X_SENDFILE'] = os.environ.get('USE_X_SENDFILE') == '1'
+app.config['X_ACCEL_REDIRECT'] = os.environ.get('X_ACCEL_REDIRECT', '')
+
+cache = Cache(app, config={'CACHE_TYPE': 'SimpleCache'})
+
+DATABASE = "mantenimiento.db"
+XLSX_MIMETYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+class PoolConexiones:
+    """Pool de conexiones SQLite reutilizables entre peticiones."""
+    
+    def __init__(self, db_path, tamano=5):
+        self.db_path = db_path
+        self.tamano = tamano
+        self._libres = queue.Queue(maxsize=tamano)
+        self._creadas = 0
+        self._lock = threading.Lock()
+    
+    def _conectar(self):
+        # Las conexiones viven mientras dure el proceso, así que la caché de
+        # sentencias preparadas de sqlite3 evita volver a compilar las consultas
+        conn = sqlite3.connect(self.db_path, check_same_thread=False, cached_statements=256)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA cache_size=-64000")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        return conn
+    
+    @contextmanager
+    def acquire(self):
+        """Presta una conexión del pool y la devuelve al terminar.
+        
+        Igual que ``with sqlite3.connect(...)``, confirma la transacción si el
+        bloque termina bien y la revierte si se produce una excepción.
+        """
+        try:
+            conn = self._libres.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                crear = self._creadas < self.tamano
+                if crear:
+                    self._creadas += 1
+            conn = self._conectar() if crear else self._libres.get()
+        try:
+            with conn:
+                yield conn
+        finally:
+            self._libres.put(conn)
+
+pool = PoolConexiones(DATABASE)
 
 # Crear base de datos si no existe o actualizarla
 def init_db():
-    with sqlite3.connect("mantenimiento.db") as conn:
+    with pool.acquire() as conn:
         cursor = conn.cursor()
+        
+        # El índice es lo último que crea la migración: si ya existe, el esquema
+        # está al día y no hace falta tomar el bloqueo de escritura
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = 'idx_mantenimiento_fecha_id'")
+        if cursor.fetchone():
+            return
+        
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS mantenimiento (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -27,13 +100,25 @@ def init_db():
                 archivo TEXT
             )
         ''')
-        try:
+        columnas = {fila[1] for fila in cursor.execute("PRAGMA table_info(mantenimiento)")}
+        if 'archivo' not in columnas:
             cursor.execute("ALTER TABLE mantenimiento ADD COLUMN archivo TEXT;")
-        except sqlite3.OperationalError:
-            pass  # La columna ya existe
+        # (fecha, id) es la clave de paginación del historial
+        cursor.execute("DROP INDEX IF EXISTS idx_mantenimiento_fecha")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_mantenimiento_fecha_id ON mantenimiento (fecha DESC, id DESC)")
         conn.commit()
 
-init_db()
+@app.cli.command('init-db')
+def init_db_command():
+    """Crea o actualiza el esquema de la base de datos."""
+    init_db()
+    click.echo('Base de datos inicializada.')
+
+def guardar_archivo(archivo, filepath):
+    """Copia el archivo subido a disco en bloques de 1 MB y devuelve su tamaño."""
+    with open(filepath, 'wb') as f:
+        shutil.copyfileobj(archivo.stream, f, 1 << 20)
+        return f.tell()
 
 @app.route('/')
 def index():
@@ -51,9 +136,9 @@ def guardar():
     if archivo and archivo.filename:
         filename = secure_filename(archivo.filename)
         filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-        archivo.save(filepath)
+        guardar_archivo(archivo, filepath)
     
-    with sqlite3.connect("mantenimiento.db") as conn:
+    with pool.acquire() as conn:
         cursor = conn.cursor()
         cursor.execute("INSERT INTO mantenimiento (fecha, tipo, checklist, comentarios, archivo) VALUES (?, ?, ?, ?, ?)",
                        (fecha, tipo, checklist, comentarios, filename))
@@ -61,52 +146,156 @@ def guardar():
     
     return redirect(url_for('historial'))
 
+def iterar_historial(limite, desde_fecha=None, desde_id=None):
+    """Genera una página del historial a medida que se leen las filas del cursor.
+    
+    La paginación es por clave (fecha, id): cada página continúa después del
+    último registro de la anterior, de modo que el coste no crece con el
+    número de páginas como ocurriría con OFFSET.
+    """
+    query = "SELECT * FROM mantenimiento"
+    params = []
+    if desde_fecha and desde_id:
+        query += " WHERE (fecha, id) < (?, ?)"
+        params.extend([desde_fecha, desde_id])
+    query += " ORDER BY fecha DESC, id DESC LIMIT ?"
+    params.append(limite)
+    
+    with pool.acquire() as conn:
+        cursor = conn.cursor()
+        cursor.execute(query, params)
+        yield from cursor
+
 @app.route('/historial')
 def historial():
-    with sqlite3.connect("mantenimiento.db") as conn:
-        cursor = conn.cursor()
-        cursor.execute("SELECT * FROM mantenimiento ORDER BY fecha DESC")
-        registros = cursor.fetchall()
-    return render_template('historial.html', registros=registros)
+    limite = max(1, min(request.args.get('limite', 50, type=int), 500))
+    desde_fecha = request.args.get('desde_fecha')
+    desde_id = request.args.get('desde_id', type=int)
+    
+    # La plantilla se envía a medida que llegan las filas, sin cargar toda la
+    # página en memoria antes de empezar a responder
+    return stream_template(
+        'historial.html',
+        registros=iterar_historial(limite, desde_fecha, desde_id),
+        limite=limite,
+        primera_pagina=not desde_id
+    )
 
 @app.route('/uploads/<filename>')
 def uploaded_file(filename):
-    return send_from_directory(app.config['UPLOAD_FOLDER'], filename)
+    if app.config['X_ACCEL_REDIRECT']:
+        ruta_interna = safe_join(app.config['X_ACCEL_REDIRECT'], filename)
+        if ruta_interna is None:
+            abort(404)
+        respuesta = Response()
+        respuesta.headers['X-Accel-Redirect'] = ruta_interna
+        return respuesta
+    return send_from_directory(app.config['UPLOAD_FOLDER'], filename, conditional=True)
+
+def construir_excel(cursor):
+    """Genera el libro de Excel del historial y devuelve su contenido en bytes."""
+    # Importación diferida: solo la exportación necesita openpyxl
+    import openpyxl
+    
+    cursor.execute("SELECT fecha, tipo, checklist, comentarios FROM mantenimiento ORDER BY fecha DESC")
+    
+    # Volcar las filas del cursor directamente a un libro en modo
+    # write_only, sin pasar por DataFrame ni estilos por celda
+    wb = openpyxl.Workbook(write_only=True)
+    ws = wb.create_sheet('Mantenimiento')
+    ws.append(['fecha', 'tipo', 'checklist', 'comentarios'])
+    for registro in cursor:
+        ws.append(registro)
+    
+    buffer = io.BytesIO()
+    wb.save(buffer)
+    return buffer.getvalue()
+
+# Las exportaciones se generan en segundo plano para no bloquear el worker
+# que atiende la petición; un mismo estado del historial se genera una sola vez
+exportador = ThreadPoolExecutor(max_workers=2, thread_name_prefix='exportar-excel')
+exportaciones = {}
+exportaciones_lock = threading.Lock()
+
+def firma_historial():
+    """Devuelve una firma que cambia en cuanto se inserta o elimina un registro."""
+    with pool.acquire() as conn:
+        max_id, total = conn.execute("SELECT MAX(id), COUNT(*) FROM mantenimiento").fetchone()
+    return f'{max_id}-{total}'
+
+def generar_excel(trabajo_id):
+    """Genera el libro y lo deja en caché bajo el identificador del trabajo."""
+    with app.app_context():
+        with pool.acquire() as conn:
+            contenido = construir_excel(conn.cursor())
+        cache.set(f'exportar_excel:{trabajo_id}', contenido)
+
+def enviar_excel(trabajo_id, contenido):
+    # Generar nombre único para el archivo
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    excel_filename = f'mantenimiento_bomba_warman_{timestamp}.xlsx'
+    
+    # Enviar el archivo; la firma sirve de ETag para que el navegador
+    # reutilice una descarga anterior si el historial no ha cambiado
+    return send_file(
+        io.BytesIO(contenido),
+        as_attachment=True,
+        download_name=excel_filename,
+        mimetype=XLSX_MIMETYPE,
+        etag=trabajo_id,
+        conditional=True,
+        max_age=0
+    )
 
 @app.route('/exportar-excel')
 def exportar_excel():
     try:
-        with sqlite3.connect("mantenimiento.db") as conn:
-            conn.row_factory = sqlite3.Row
-            cursor = conn.cursor()
-            cursor.execute("SELECT fecha, tipo, checklist, comentarios FROM mantenimiento ORDER BY fecha DESC")
-            registros = cursor.fetchall()
-            
-            # Convertir los registros a una lista de diccionarios
-            data = [dict(registro) for registro in registros]
-            
-            # Crear DataFrame
-            df = pd.DataFrame(data)
+        trabajo_id = firma_historial()
+        
+        # Si este estado del historial ya se exportó, se entrega directamente
+        contenido = cache.get(f'exportar_excel:{trabajo_id}')
+        if contenido is not None:
+            return enviar_excel(trabajo_id, contenido)
+        
+        with exportaciones_lock:
+            trabajo = exportaciones.get(trabajo_id)
+            # Un trabajo terminado sin resultado en caché falló o su resultado
+            # ya expiró: hay que volver a generarlo
+            if trabajo is None or trabajo.done():
+                exportaciones[trabajo_id] = exportador.submit(generar_excel, trabajo_id)
+        
+        return redirect(url_for('estado_exportacion', trabajo_id=trabajo_id))
             
-            # Generar nombre único para el archivo
-            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-            excel_filename = f'mantenimiento_bomba_warman_{timestamp}.xlsx'
-            excel_path = os.path.join(app.config['UPLOAD_FOLDER'], excel_filename)
-            
-            # Guardar a Excel
-            df.to_excel(excel_path, index=False, sheet_name='Mantenimiento')
-            
-            # Enviar el archivo
-            return send_from_directory(
-                directory=app.config['UPLOAD_FOLDER'],
-                path=excel_filename,
-                as_attachment=True,
-                download_name=excel_filename
-            )
-            
-    except Exception as e:
-        print(f"Error al exportar a Excel: {str(e)}")
+    except Exception:
+        logger.exception("Error al exportar a Excel")
+        return redirect(url_for('historial'))
+
+@app.route('/exportar-excel/estado/<trabajo_id>')
+def estado_exportacion(trabajo_id):
+    contenido = cache.get(f'exportar_excel:{trabajo_id}')
+    if contenido is not None:
+        with exportaciones_lock:
+            exportaciones.pop(trabajo_id, None)
+        return enviar_excel(trabajo_id, contenido)
+    
+    with exportaciones_lock:
+        trabajo = exportaciones.get(trabajo_id)
+    
+    if trabajo is None:
+        # Trabajo desconocido (por ejemplo, atendido por otro proceso)
+        return redirect(url_for('exportar_excel'))
+    
+    if trabajo.done():
+        with exportaciones_lock:
+            exportaciones.pop(trabajo_id, None)
+        if trabajo.exception() is None:
+            # El resultado expiró de la caché antes de descargarse
+            return redirect(url_for('exportar_excel'))
+        logger.error("Error al exportar a Excel", exc_info=trabajo.exception())
         return redirect(url_for('historial'))
+    
+    return render_template('exportando.html', trabajo_id=trabajo_id), 202
 
 if __name__ == '__main__':
+    init_db()
     app.run(debug=True)
@@ -16,8 +16,9 @@ if str(src_path) not in sys.path:
 from mantenimiento import create_app
 
 if __name__ == '__main__':
-    # Crear la aplicación
+    # Crear la aplicación y las tablas si no existen
     app = create_app()
+    app.db_manager._create_tables()
     
     # Iniciar la aplicación Flask
     print("Iniciando la aplicación de Gestión de Mantenimiento...")
@@ -19,12 +19,16 @@ setup(
         "mantenimiento": ["templates/*", "static/*"],
     },
     install_requires=[
-        'Flask>=2.0.1',
+        'Flask>=2.2.0',
+        'Flask-Caching>=2.0.0',
         'python-dotenv>=0.19.0',
         'Werkzeug>=2.0.1',
-        'pandas>=1.3.0',
+        'openpyxl>=3.0.0',
     ],
-    python_requires='>=3.8',
+    extras_require={
+        'orjson': ['orjson>=3.6'],
+    },
+    python_requires='>=3.10',
     entry_points={
         'console_scripts': [
             'mantenimiento=mantenimiento.__main__:main',
@@ -5,35 +5,51 @@ Este módulo proporciona la interfaz web para el sistema de gestión de mantenim
 integrando los módulos de modelos, base de datos y utilidades.
 """
 
+import logging
 import os
-from pathlib import Path
+import shutil
+import click
 from flask import Flask, render_template, request, redirect, url_for, send_from_directory, flash, jsonify
+from flask_caching import Cache
 from werkzeug.utils import secure_filename
-import pandas as pd
 from datetime import datetime
 
 # Importar módulos propios
-from utils.database import DatabaseManager
-from utils.data_loader import DataLoader
-from utils.kpi_calculator import KPICalculator
-from models import Activo, Falla, OrdenTrabajo
+from mantenimiento.utils.database import DatabaseManager
+from mantenimiento.utils.data_loader import DataLoader
+from mantenimiento.utils.kpi_calculator import KPICalculator
+from mantenimiento.utils.json_provider import configurar_json
+from mantenimiento.utils.fs import asegurar_directorio
+from mantenimiento.utils.clock import formatear_fecha
+from mantenimiento.models import Activo, Falla, OrdenTrabajo
+
+logger = logging.getLogger(__name__)
 
 # Configuración de la aplicación
 app = Flask(__name__)
 app.secret_key = os.environ.get('SECRET_KEY', 'dev-key-123')
 
+# Serializar las respuestas JSON con orjson si está instalado
+configurar_json(app)
+
+# Las fechas llegan de SQLite como texto ISO 8601
+app.add_template_filter(formatear_fecha, 'fecha')
+
 # Configuración de rutas
 UPLOAD_FOLDER = 'uploads'
 BACKUP_FOLDER = 'backups'
 app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
+app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max upload size
 
-# Asegurar que existan los directorios necesarios
-Path(UPLOAD_FOLDER).mkdir(exist_ok=True)
-Path(BACKUP_FOLDER).mkdir(exist_ok=True)
+# Caché en memoria para consultas que cambian poco
+cache = Cache(app, config={'CACHE_TYPE': 'SimpleCache'})
 
 # Inicializar el gestor de base de datos
 db_manager = DatabaseManager("mantenimiento.db")
 
+# Cerrar la conexión del hilo al terminar cada petición
+app.teardown_appcontext(db_manager.close_connection)
+
 # Cargar datos de ejemplo si la base de datos está vacía
 def cargar_datos_iniciales():
     """Carga datos de ejemplo si la base de datos está vacía."""
@@ -41,19 +57,42 @@ def cargar_datos_iniciales():
         # Verificar si ya hay datos
         activos = db_manager.execute_query("SELECT COUNT(*) as count FROM activos")
         if activos and activos[0]['count'] == 0:
-            # Cargar datos de ejemplo
-            datos = DataLoader.cargar_datos_ejemplo("data/example")
-            
-            # Insertar datos en la base de datos
-            for tipo, objetos in datos.items():
-                DataLoader.insertar_en_bd(objetos, db_manager)
+            # Importar los CSV de ejemplo por lotes, en una transacción
+            DataLoader.importar_datos_ejemplo("data/example", db_manager)
             
-            print("Datos de ejemplo cargados correctamente.")
-    except Exception as e:
-        print(f"Error al cargar datos iniciales: {e}")
+            logger.info("Datos de ejemplo cargados correctamente.")
+    except Exception:
+        logger.exception("Error al cargar datos iniciales")
 
-# Llamar a la función para cargar datos iniciales
-cargar_datos_iniciales()
+@app.cli.command('init-db')
+def init_db_command():
+    """Crea las tablas de la base de datos si no existen."""
+    db_manager._create_tables()
+    click.echo('Base de datos inicializada.')
+
+@app.cli.command('seed')
+def seed_command():
+    """Carga los datos de ejemplo si la base de datos está vacía."""
+    cargar_datos_iniciales()
+
+def guardar_archivo(archivo, filepath):
+    """Copia el archivo subido a disco en bloques de 1 MB y devuelve su tamaño."""
+    with open(filepath, 'wb') as f:
+        shutil.copyfileobj(archivo.stream, f, 1 << 20)
+        return f.tell()
+
+@cache.memoize(timeout=300)
+def obtener_tecnicos():
+    """Devuelve los técnicos asignados a alguna orden de trabajo.
+    
+    La lista cambia muy poco, así que se guarda en caché cinco minutos. Si se
+    añaden rutas que crean o modifican órdenes de trabajo, deben llamar a
+    ``cache.delete_memoized(obtener_tecnicos)``.
+    """
+    tecnicos = db_manager.execute_query(
+        "SELECT DISTINCT tecnico_asignado FROM ordenes_trabajo WHERE tecnico_asignado IS NOT NULL AND tecnico_asignado <> '' ORDER BY 1"
+    )
+    return [t['tecnico_asignado'] for t in tecnicos]
 
 # Rutas de la aplicación
 @app.route('/')
@@ -109,29 +148,38 @@ def nuevo_activo():
 def ver_activo(activo_id):
     """Muestra los detalles de un activo específico."""
     try:
-        activo = db_manager.get_activo(activo_id)
+        # Obtener el activo, sus fallas y sus órdenes de trabajo en un solo viaje
+        activo, fallas, ordenes = db_manager.execute_queries([
+            ("SELECT * FROM activos WHERE activo_id = ?", (activo_id,)),
+            (
+                """
+                SELECT falla_id, fecha_reporte, fecha_cierre, descripcion, estado,
+                       prioridad, tiempo_fuera_servicio_h, asignado_a
+                FROM fallas
+                WHERE activo_id = ?
+                ORDER BY fecha_reporte DESC
+                """,
+                (activo_id,)
+            ),
+            (
+                """
+                SELECT ot_id, tipo, estado, descripcion, prioridad, fecha_creacion,
+                       fecha_programada, fecha_fin, tecnico_asignado, costo_real
+                FROM ordenes_trabajo 
+                WHERE activo_id = ? 
+                ORDER BY fecha_creacion DESC
+                """,
+                (activo_id,)
+            )
+        ])
         if not activo:
             flash('Activo no encontrado', 'error')
             return redirect(url_for('listar_activos'))
+        activo = dict(activo[0])
         
-        # Obtener fallas del activo
-        fallas = db_manager.execute_query(
-            "SELECT * FROM fallas WHERE activo_id = ? ORDER BY fecha_reporte DESC",
-            (activo_id,)
-        )
-        
-        # Obtener órdenes de trabajo del activo
-        ordenes = db_manager.execute_query(
-            """
-            SELECT * FROM ordenes_trabajo 
-            WHERE activo_id = ? 
-            ORDER BY fecha_creacion DESC
-            """,
-            (activo_id,)
-        )
-        
-        # Calcular KPIs
-        kpis = KPICalculator.calcular_kpis_activo(fallas, ordenes)
+        # Calcular KPIs con agregados en SQLite; las filas de arriba quedan
+        # como sqlite3.Row para la plantilla, sin convertir cada una en dict
+        kpis = KPICalculator.sql_kpis_activo(db_manager, activo_id)
         
         return render_template(
             'activos/detalle.html',
@@ -155,10 +203,14 @@ def listar_fallas():
         fecha_desde = request.args.get('fecha_desde', '')
         fecha_hasta = request.args.get('fecha_hasta', '')
         activo_id = request.args.get('activo_id', '')
+        limite = max(1, min(request.args.get('limite', 50, type=int), 500))
+        desde_fecha = request.args.get('desde_fecha')
+        desde_id = request.args.get('desde_id', type=int)
         
-        # Construir la consulta base
+        # Construir la consulta base con solo las columnas que muestra el listado
         query = """
-            SELECT f.*, a.nombre as nombre_activo 
+            SELECT f.falla_id, f.activo_id, f.descripcion, f.fecha_reporte,
+                   f.prioridad, f.estado, a.nombre as nombre_activo
             FROM fallas f
             LEFT JOIN activos a ON f.activo_id = a.activo_id
             WHERE 1=1
@@ -174,23 +226,40 @@ def listar_fallas():
             query += " AND f.prioridad = ?"
             params.append(int(prioridad))
             
+        # Comparar la columna sin envolverla en DATE() para que se use el índice;
+        # las fechas ISO-8601 se ordenan correctamente como texto
         if fecha_desde:
-            query += " AND DATE(f.fecha_reporte) >= ?"
+            query += " AND f.fecha_reporte >= ?"
             params.append(fecha_desde)
             
         if fecha_hasta:
-            query += " AND DATE(f.fecha_reporte) <= ?"
+            query += " AND f.fecha_reporte < DATE(?, '+1 day')"
             params.append(fecha_hasta)
             
         if activo_id:
             query += " AND f.activo_id = ?"
             params.append(int(activo_id))
         
-        # Ordenar por fecha de reporte descendente
-        query += " ORDER BY f.fecha_reporte DESC"
+        # Paginación por clave (fecha_reporte, falla_id): cada página continúa
+        # después de la última falla de la anterior, sin OFFSET
+        if desde_fecha and desde_id:
+            query += " AND (f.fecha_reporte, f.falla_id) < (?, ?)"
+            params.extend([desde_fecha, desde_id])
+        
+        # Ordenar por fecha de reporte descendente; se pide una fila de más
+        # para saber si existe una página siguiente
+        query += " ORDER BY f.fecha_reporte DESC, f.falla_id DESC LIMIT ?"
+        params.append(limite + 1)
         
         # Obtener las fallas filtradas
         fallas = db_manager.execute_query(query, tuple(params))
+        siguiente = None
+        if len(fallas) > limite:
+            fallas = fallas[:limite]
+            siguiente = {
+                'desde_fecha': fallas[-1]['fecha_reporte'],
+                'desde_id': fallas[-1]['falla_id']
+            }
         
         # Obtener lista de activos para el filtro
         activos = db_manager.execute_query("SELECT activo_id, nombre FROM activos ORDER BY nombre")
@@ -198,6 +267,7 @@ def listar_fallas():
         return render_template('fallas/lista.html', 
                              fallas=fallas, 
                              activos=activos,
+                             siguiente=siguiente,
                              filtros={
                                  'estado': estado,
                                  'prioridad': prioridad,
@@ -238,8 +308,9 @@ def reportar_falla():
                 for file in request.files.getlist('documentos'):
                     if file.filename != '':
                         filename = secure_filename(file.filename)
-                        filepath = os.path.join(app.config['UPLOAD_FOLDER'], f'falla_{falla_id}_{filename}')
-                        file.save(filepath)
+                        carpeta = asegurar_directorio(app.config['UPLOAD_FOLDER'])
+                        filepath = os.path.join(carpeta, f'falla_{falla_id}_{filename}')
+                        tamano = guardar_archivo(file, filepath)
                         # Guardar referencia en la base de datos
                         db_manager.insert_documento({
                             'tipo_entidad': 'falla',
@@ -247,7 +318,7 @@ def reportar_falla():
                             'nombre_archivo': filename,
                             'ruta_archivo': filepath,
                             'tipo_mime': file.mimetype,
-                            'tamano': os.path.getsize(filepath)
+                            'tamano': tamano
                         })
             
             flash('Falla reportada correctamente', 'success')
@@ -259,26 +330,53 @@ def reportar_falla():
     
     # Para GET, mostrar el formulario de reporte
     activos = db_manager.execute_query("SELECT activo_id, nombre FROM activos WHERE estado = 'Activo' ORDER BY nombre")
-    tecnicos = db_manager.execute_query("SELECT DISTINCT tecnico_asignado FROM ordenes_trabajo WHERE tecnico_asignado IS NOT NULL")
     return render_template('fallas/formulario.html', 
                          falla=None, 
                          activos=activos, 
-                         tecnicos=[t['tecnico_asignado'] for t in tecnicos if t['tecnico_asignado']])
+                         tecnicos=obtener_tecnicos())
 
 @app.route('/fallas/<int:falla_id>')
 def ver_falla(falla_id):
     """Muestra los detalles de una falla específica."""
     try:
-        # Obtener la falla con información del activo
-        falla = db_manager.execute_query(
-            """
-            SELECT f.*, a.nombre as nombre_activo, a.criticidad, a.ubicacion
-            FROM fallas f
-            LEFT JOIN activos a ON f.activo_id = a.activo_id
-            WHERE f.falla_id = ?
-            """,
-            (falla_id,)
-        )
+        # Obtener la falla con información del activo, sus documentos, las
+        # órdenes de trabajo del activo y el historial en un solo viaje. Las
+        # órdenes se obtienen uniendo con fallas para no depender del
+        # resultado de la primera consulta.
+        falla, documentos, ordenes, historial = db_manager.execute_queries([
+            (
+                """
+                SELECT f.*, a.nombre as nombre_activo, a.criticidad, a.ubicacion
+                FROM fallas f
+                LEFT JOIN activos a ON f.activo_id = a.activo_id
+                WHERE f.falla_id = ?
+                """,
+                (falla_id,)
+            ),
+            (
+                "SELECT * FROM documentos WHERE tipo_entidad = 'falla' AND entidad_id = ?",
+                (falla_id,)
+            ),
+            (
+                """
+                SELECT ot.ot_id, ot.tipo, ot.estado, ot.prioridad,
+                       ot.fecha_inicio, ot.fecha_fin, ot.fecha_creacion
+                FROM fallas f
+                JOIN ordenes_trabajo ot ON ot.activo_id = f.activo_id
+                WHERE f.falla_id = ?
+                ORDER BY ot.fecha_creacion DESC
+                """,
+                (falla_id,)
+            ),
+            (
+                """
+                SELECT * FROM historial_cambios
+                WHERE entidad = 'falla' AND entidad_id = ?
+                ORDER BY fecha_cambio DESC
+                """,
+                (falla_id,)
+            )
+        ])
         
         if not falla:
             flash('Falla no encontrada', 'error')
@@ -286,34 +384,6 @@ def ver_falla(falla_id):
         
         falla = falla[0]  # Obtener el primer (y único) resultado
         
-        # Obtener documentos adjuntos
-        documentos = db_manager.execute_query(
-            "SELECT * FROM documentos WHERE tipo_entidad = 'falla' AND entidad_id = ?",
-            (falla_id,)
-        )
-        
-        # Obtener órdenes de trabajo relacionadas
-        ordenes = db_manager.execute_query(
-            """
-            SELECT ot.*, a.nombre as nombre_activo
-            FROM ordenes_trabajo ot
-            LEFT JOIN activos a ON ot.activo_id = a.activo_id
-            WHERE ot.activo_id = ?
-            ORDER BY ot.fecha_creacion DESC
-            """,
-            (falla['activo_id'],)
-        )
-        
-        # Obtener historial de cambios
-        historial = db_manager.execute_query(
-            """
-            SELECT * FROM historial_cambios
-            WHERE entidad = 'falla' AND entidad_id = ?
-            ORDER BY fecha_cambio DESC
-            """,
-            (falla_id,)
-        )
-        
         return render_template('fallas/detalle.html',
                              falla=falla,
                              documentos=documentos,
@@ -377,12 +447,11 @@ def editar_falla(falla_id):
             return redirect(url_for('listar_fallas'))
             
         activos = db_manager.execute_query("SELECT activo_id, nombre FROM activos ORDER BY nombre")
-        tecnicos = db_manager.execute_query("SELECT DISTINCT tecnico_asignado FROM ordenes_trabajo WHERE tecnico_asignado IS NOT NULL")
         
         return render_template('fallas/formulario.html', 
                              falla=falla, 
                              activos=activos, 
-                             tecnicos=[t['tecnico_asignado'] for t in tecnicos if t['tecnico_asignado']],
+                             tecnicos=obtener_tecnicos(),
                              modo_edicion=True)
         
     except Exception as e:
@@ -420,8 +489,8 @@ def eliminar_falla(falla_id):
                 try:
                     if os.path.exists(doc['ruta_archivo']):
                         os.remove(doc['ruta_archivo'])
-                except Exception as e:
-                    print(f"Error al eliminar archivo {doc['ruta_archivo']}: {str(e)}")
+                except OSError:
+                    logger.exception("Error al eliminar archivo %s", doc['ruta_archivo'])
             
             # Eliminar registros de documentos en la base de datos
             db_manager.execute_query(
@@ -497,17 +566,8 @@ def listar_ordenes_trabajo():
 def api_kpis_activo(activo_id):
     """API para obtener los KPIs de un activo."""
     try:
-        fallas = db_manager.execute_query(
-            "SELECT * FROM fallas WHERE activo_id = ?",
-            (activo_id,)
-        )
-        
-        ordenes = db_manager.execute_query(
-            "SELECT * FROM ordenes_trabajo WHERE activo_id = ?",
-            (activo_id,)
-        )
-        
-        kpis = KPICalculator.calcular_kpis_activo(fallas, ordenes)
+        # Los agregados se calculan en SQLite; no hace falta traer cada fila
+        kpis = KPICalculator.sql_kpis_activo(db_manager, activo_id)
         return jsonify(kpis)
         
     except Exception as e:
@@ -567,8 +627,9 @@ def error_servidor(error):
     return render_template('errores/500.html'), 500
 
 if __name__ == '__main__':
-    # Crear tablas si no existen
+    # Crear tablas si no existen y cargar datos de ejemplo
     db_manager._create_tables()
+    cargar_datos_iniciales()
     
     # Iniciar la aplicación
     app.run(debug=True)
@@ -8,48 +8,46 @@ Este paquete contiene los módulos principales de la aplicación:
 - static: Archivos estáticos (CSS, JS, imágenes)
 """
 
-import os
-
-# Importar la función de fábrica de la aplicación
-from .factory import create_app
-
-# Crear la aplicación por defecto para facilitar la importación
-app = create_app()
-
-# Importar y configurar extensiones
-try:
-    from .extensions import db_manager
-    
-    # Importar modelos
-    from .models.activo import Activo
-    from .models.falla import Falla, EstadoFalla
-    from .models.orden_trabajo import OrdenTrabajo, EstadoOrden, TipoOrden
-    
-    # Importar utilidades
-    from .utils.data_loader import DataLoader
-    from .utils.kpi_calculator import KPICalculator
-    
-    # Importar rutas después de la configuración para evitar importaciones circulares
-    from . import routes
-    
-    # Configuración de la aplicación
-    app.config.update(
-        SECRET_KEY=os.environ.get('SECRET_KEY', 'dev-key-123'),
-        UPLOAD_FOLDER=os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'uploads'),
-        MAX_CONTENT_LENGTH=16 * 1024 * 1024,  # 16MB max upload size
-        TEMPLATES_AUTO_RELOAD=True
-    )
-    
-    # Asegurarse de que exista el directorio de subidas
-    os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
-    
-except ImportError as e:
-    print(f"Error al importar módulos: {e}")
+import sys
+from importlib import import_module
+
+# Modelos y utilidades que se exportan desde el paquete; se importan al
+# primer acceso (PEP 562) para no cargarlos en cada arranque
+_EXPORTACIONES_DIFERIDAS = {
+    'create_app': '.factory',
+    'Activo': '.models.activo',
+    'Falla': '.models.falla',
+    'EstadoFalla': '.models.falla',
+    'OrdenTrabajo': '.models.orden_trabajo',
+    'EstadoOrden': '.models.orden_trabajo',
+    'TipoOrden': '.models.orden_trabajo',
+    'DataLoader': '.utils.data_loader',
+    'KPICalculator': '.utils.kpi_calculator',
+}
+
+
+def __getattr__(name):
+    if name == 'app':
+        # La aplicación por defecto se crea en el primer acceso: create_app()
+        # crea los directorios de instance/, y importar el paquete no debe
+        valor = sys.modules[__name__].create_app()
+    elif name == 'db_manager':
+        # Gestor de base de datos de la aplicación por defecto
+        valor = sys.modules[__name__].app.db_manager
+    else:
+        modulo = _EXPORTACIONES_DIFERIDAS.get(name)
+        if modulo is None:
+            raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+        valor = getattr(import_module(modulo, __name__), name)
+    globals()[name] = valor
+    return valor
+
 
 __version__ = '0.1.0'
 
 # Lista de símbolos que se exportan cuando se usa 'from mantenimiento import *'
 __all__ = [
+    'create_app',
     'app',
     'db_manager',
     'Activo',
@@ -7,9 +7,12 @@ Este módulo permite ejecutar la aplicación directamente con:
 
 from .app import app, db_manager
 
-if __name__ == '__main__':
-    # Crear tablas si no existen
+
+def main():
+    """Crea las tablas si no existen e inicia el servidor de desarrollo."""
     db_manager._create_tables()
-    
-    # Iniciar la aplicación
     app.run(debug=True)
+
+
+if __name__ == '__main__':
+    main()
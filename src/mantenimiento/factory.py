@@ -3,10 +3,48 @@ Módulo de fábrica de la aplicación Flask.
 
 Este módulo proporciona una función para crear y configurar la aplicación Flask.
 """
+import logging
 import os
 from pathlib import Path
+import click
 from flask import Flask
+from jinja2 import FileSystemBytecodeCache
 from .utils.database import DatabaseManager
+from .utils.clock import formatear_fecha
+from .utils.fs import asegurar_directorio
+from .utils.json_provider import configurar_json
+
+logger = logging.getLogger(__name__)
+
+# Rutas de bases de datos que ya se comprobaron con datos, para no repetir la
+# consulta cada vez que se crea una aplicación sobre la misma base
+_bases_con_datos = set()
+
+
+def cargar_datos_iniciales(db_manager, directorio="data/example"):
+    """Carga los datos de ejemplo si la base de datos está vacía.
+    
+    Args:
+        db_manager: Instancia de DatabaseManager.
+        directorio: Carpeta con los CSV de ejemplo.
+        
+    Returns:
+        bool: True si se cargaron datos, False si la base ya tenía datos.
+    """
+    if db_manager.db_path in _bases_con_datos:
+        return False
+    
+    if db_manager.execute_query("SELECT 1 FROM activos LIMIT 1"):
+        _bases_con_datos.add(db_manager.db_path)
+        return False
+    
+    from .utils.data_loader import DataLoader
+    
+    # Cada CSV se convierte en objetos del modelo y se inserta por lotes
+    DataLoader.importar_datos_ejemplo(directorio, db_manager)
+    
+    _bases_con_datos.add(db_manager.db_path)
+    return True
 
 
 def create_app(test_config=None):
@@ -18,6 +56,9 @@ def create_app(test_config=None):
     Returns:
         Flask: La aplicación Flask configurada.
     """
+    # Nivel de los mensajes de log, configurable con LOG_LEVEL
+    logging.getLogger().setLevel(os.environ.get('LOG_LEVEL', 'INFO').upper())
+    
     # Crear la instancia de la aplicación
     app = Flask(__name__, instance_relative_config=True)
     
@@ -27,7 +68,8 @@ def create_app(test_config=None):
         UPLOAD_FOLDER=os.path.join(app.instance_path, 'uploads'),
         MAX_CONTENT_LENGTH=16 * 1024 * 1024,  # 16MB max upload size
         DATABASE=os.path.join(app.instance_path, 'mantenimiento.db'),
-        TEMPLATES_AUTO_RELOAD=True
+        SQLITE_SYNCHRONOUS=os.environ.get('SQLITE_SYNCHRONOUS', 'NORMAL'),
+        SEED_ON_STARTUP=os.environ.get('SEED_ON_STARTUP', '').lower() in ('1', 'true'),
     )
     
     # Aplicar configuración de prueba si se proporciona
@@ -40,20 +82,49 @@ def create_app(test_config=None):
     
     # Asegurarse de que exista la carpeta de instancia
     try:
-        os.makedirs(app.instance_path, exist_ok=True)
-        os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
-    except OSError as e:
-        print(f"Error al crear directorios: {e}")
+        asegurar_directorio(app.instance_path)
+        asegurar_directorio(app.config['UPLOAD_FOLDER'])
+        
+        # Guardar las plantillas compiladas para que los workers nuevos no
+        # tengan que volver a compilarlas
+        app.jinja_env.bytecode_cache = FileSystemBytecodeCache(
+            asegurar_directorio(os.path.join(app.instance_path, 'jinja_cache'))
+        )
+    except OSError:
+        logger.exception("Error al crear directorios")
+    
+    # Serializar las respuestas JSON con orjson si está instalado
+    configurar_json(app)
     
-    # Inicializar la base de datos
-    db_manager = DatabaseManager(app.config['DATABASE'])
-    db_manager._create_tables()
+    # Las fechas llegan de SQLite como texto ISO 8601
+    app.add_template_filter(formatear_fecha, 'fecha')
+    
+    # Cada aplicación tiene su propio gestor de base de datos; las tablas se
+    # crean con `flask init-db` para no ejecutar DDL en cada arranque
+    db_manager = DatabaseManager(app.config['DATABASE'], app.config['SQLITE_SYNCHRONOUS'])
+    db_manager.init_app(app)
+    
+    @app.cli.command('init-db')
+    def init_db_command():
+        """Crea las tablas de la base de datos si no existen."""
+        db_manager._create_tables()
+        click.echo('Base de datos inicializada.')
+    
+    @app.cli.command('seed')
+    def seed_command():
+        """Carga los datos de ejemplo si la base de datos está vacía."""
+        if cargar_datos_iniciales(db_manager):
+            click.echo('Datos de ejemplo cargados correctamente.')
+        else:
+            click.echo('La base de datos ya contiene datos.')
+    
+    # Solo para desarrollo: crear las tablas y sembrar al arrancar
+    if app.config['SEED_ON_STARTUP']:
+        db_manager._create_tables()
+        cargar_datos_iniciales(db_manager)
     
     # Registrar blueprints
     from . import routes
     app.register_blueprint(routes.bp)
     
-    # Hacer que el gestor de base de datos esté disponible en el contexto de la aplicación
-    app.db_manager = db_manager
-    
     return app
@@ -2,7 +2,7 @@ from dataclasses import dataclass, field
 from datetime import datetime
 from typing import Optional, List, Dict, Any, ClassVar
 
-@dataclass
+@dataclass(slots=True)
 class Activo:
     """
     Clase que representa un activo o equipo en el sistema de mantenimiento.
@@ -30,6 +30,21 @@ class Activo:
     ultimo_mantenimiento: Optional[str] = None
     proximo_mantenimiento: Optional[str] = None
     
+    # Columnas de la tabla activos en el orden que devuelve to_row()
+    _COLS: ClassVar[tuple] = (
+        "activo_id", "nombre", "criticidad", "fecha_alta", "ubicacion",
+        "responsable", "estado", "horas_operacion", "ultimo_mantenimiento",
+        "proximo_mantenimiento"
+    )
+    
+    def to_row(self) -> tuple:
+        """Devuelve los valores del activo en el orden de _COLS, para executemany."""
+        return (
+            self.activo_id, self.nombre, self.criticidad, self.fecha_alta,
+            self.ubicacion, self.responsable, self.estado, self.horas_operacion,
+            self.ultimo_mantenimiento, self.proximo_mantenimiento
+        )
+    
     def to_dict(self) -> Dict[str, Any]:
         """Convierte el objeto Activo a un diccionario."""
         return {
@@ -1,8 +1,9 @@
 from dataclasses import dataclass, field
-from datetime import datetime
 from typing import Optional, Dict, Any, List, ClassVar, Union
 from enum import Enum
 
+from ..utils.clock import ahora_iso
+
 class EstadoFalla(str, Enum):
     REPORTADA = "Reportada"
     EN_REVISION = "En Revisión"
@@ -11,7 +12,10 @@ class EstadoFalla(str, Enum):
     CERRADA = "Cerrada"
     INVALIDA = "Inválida"
 
-@dataclass
+# Conversión directa de texto a Enum, sin pasar por EnumMeta.__call__
+_ESTADO_MAP = {e.value: e for e in EstadoFalla}
+
+@dataclass(slots=True)
 class Falla:
     """
     Clase que representa una falla reportada en el sistema de mantenimiento.
@@ -47,6 +51,26 @@ class Falla:
     prioridad: int = 3
     asignado_a: Optional[str] = None
     
+    # Columnas de la tabla fallas en el orden que devuelve to_row()
+    _COLS: ClassVar[tuple] = (
+        "falla_id", "activo_id", "fecha_reporte", "fecha_cierre", "descripcion",
+        "estado", "tiempo_fuera_servicio_h", "causa_raiz", "acciones_tomadas",
+        "costo_reparacion", "prioridad", "reportada_por", "asignado_a"
+    )
+    
+    def to_row(self) -> tuple:
+        """
+        Devuelve los valores de la falla en el orden de _COLS, para executemany.
+        
+        El estado se entrega como Enum; DatabaseManager registra su adaptador.
+        """
+        return (
+            self.falla_id, self.activo_id, self.fecha_reporte, self.fecha_cierre,
+            self.descripcion, self.estado, self.tiempo_fuera_servicio_h,
+            self.causa_raiz, self.acciones_tomadas, self.costo_reparacion,
+            self.prioridad, self.reportada_por, self.asignado_a
+        )
+    
     def to_dict(self) -> Dict[str, Any]:
         """Convierte el objeto Falla a un diccionario."""
         return {
@@ -69,8 +93,9 @@ class Falla:
     def from_dict(cls, data: Dict[str, Any]) -> 'Falla':
         """Crea una instancia de Falla a partir de un diccionario."""
         # Convertir el estado de string a Enum si es necesario
-        if isinstance(data.get('estado'), str):
-            data['estado'] = EstadoFalla(data['estado'])
+        estado = data.get('estado')
+        if isinstance(estado, str) and not isinstance(estado, EstadoFalla):
+            data['estado'] = _ESTADO_MAP.get(estado) or EstadoFalla(estado)
         return cls(**data)
     
     def actualizar_estado(self, nuevo_estado: EstadoFalla) -> None:
@@ -79,7 +104,7 @@ class Falla:
         
         # Si se marca como resuelta o cerrada, registrar la fecha de cierre
         if nuevo_estado in [EstadoFalla.RESUELTA, EstadoFalla.CERRADA] and not self.fecha_cierre:
-            self.fecha_cierre = datetime.now().isoformat()
+            self.fecha_cierre = ahora_iso()
     
     def asignar_tecnico(self, nombre_tecnico: str) -> None:
         """Asigna un técnico para atender la falla."""
@@ -87,9 +112,13 @@ class Falla:
         if self.estado == EstadoFalla.REPORTADA:
             self.estado = EstadoFalla.EN_REVISION
     
-    def registrar_accion(self, accion: str) -> None:
-        """Registra una acción tomada para solucionar la falla."""
-        if self.acciones_tomadas:
-            self.acciones_tomadas += "\n" + accion
-        else:
-            self.acciones_tomadas = accion
+    def registrar_accion(self, *acciones: str) -> None:
+        """
+        Registra una o varias acciones tomadas para solucionar la falla.
+        
+        Las acciones se unen en una sola operación, de modo que registrar
+        varias a la vez no copia el texto acumulado una vez por acción.
+        """
+        self.acciones_tomadas = "\n".join(
+            filter(None, (self.acciones_tomadas, *acciones))
+        )
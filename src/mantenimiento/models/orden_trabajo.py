@@ -1,8 +1,10 @@
+import math
 from dataclasses import dataclass, field
-from datetime import datetime
 from typing import Optional, Dict, Any, List, Union, ClassVar
 from enum import Enum
 
+from ..utils.clock import ahora_iso
+
 class TipoOrden(str, Enum):
     PREVENTIVO = "Preventivo"
     CORRECTIVO = "Correctivo"
@@ -19,7 +21,11 @@ class EstadoOrden(str, Enum):
     COMPLETADA = "Completada"
     CANCELADA = "Cancelada"
 
-@dataclass
+# Conversión directa de texto a Enum, sin pasar por EnumMeta.__call__
+_TIPO_MAP = {t.value: t for t in TipoOrden}
+_ESTADO_MAP = {e.value: e for e in EstadoOrden}
+
+@dataclass(slots=True)
 class OrdenTrabajo:
     """
     Clase que representa una orden de trabajo en el sistema de mantenimiento.
@@ -63,10 +69,33 @@ class OrdenTrabajo:
     costo_estimado: Optional[float] = None
     costo_real: Optional[float] = None
     
+    # Columnas de la tabla ordenes_trabajo en el orden que devuelve to_row();
+    # los materiales se guardan aparte, en materiales_ot
+    _COLS: ClassVar[tuple] = (
+        "ot_id", "activo_id", "tipo", "fecha_creacion", "fecha_programada",
+        "fecha_inicio", "fecha_fin", "estado", "descripcion", "prioridad",
+        "horas_estimadas", "horas_reales", "tecnico_asignado", "observaciones",
+        "costo_estimado", "costo_real"
+    )
+    
     def __post_init__(self):
         if self.materiales is None:
             self.materiales = []
     
+    def to_row(self) -> tuple:
+        """
+        Devuelve los valores de la orden en el orden de _COLS, para executemany.
+        
+        Tipo y estado se entregan como Enum; DatabaseManager registra sus adaptadores.
+        """
+        return (
+            self.ot_id, self.activo_id, self.tipo, self.fecha_creacion,
+            self.fecha_programada, self.fecha_inicio, self.fecha_fin, self.estado,
+            self.descripcion, self.prioridad, self.horas_estimadas,
+            self.horas_reales, self.tecnico_asignado, self.observaciones,
+            self.costo_estimado, self.costo_real
+        )
+    
     def to_dict(self) -> Dict[str, Any]:
         """Convierte el objeto OrdenTrabajo a un diccionario."""
         return {
@@ -93,10 +122,12 @@ class OrdenTrabajo:
     def from_dict(cls, data: Dict[str, Any]) -> 'OrdenTrabajo':
         """Crea una instancia de OrdenTrabajo a partir de un diccionario."""
         # Convertir los enums de string a sus respectivas clases
-        if isinstance(data.get('tipo'), str):
-            data['tipo'] = TipoOrden(data['tipo'])
-        if isinstance(data.get('estado'), str):
-            data['estado'] = EstadoOrden(data['estado'])
+        tipo = data.get('tipo')
+        if isinstance(tipo, str) and not isinstance(tipo, TipoOrden):
+            data['tipo'] = _TIPO_MAP.get(tipo) or TipoOrden(tipo)
+        estado = data.get('estado')
+        if isinstance(estado, str) and not isinstance(estado, EstadoOrden):
+            data['estado'] = _ESTADO_MAP.get(estado) or EstadoOrden(estado)
         return cls(**data)
     
     def iniciar_trabajo(self) -> None:
@@ -104,7 +135,7 @@ class OrdenTrabajo:
         if self.estado == EstadoOrden.PENDIENTE or self.estado == EstadoOrden.PROGRAMADA:
             self.estado = EstadoOrden.EN_PROCESO
             if not self.fecha_inicio:
-                self.fecha_inicio = datetime.now().isoformat()
+                self.fecha_inicio = ahora_iso()
     
     def pausar_trabajo(self) -> None:
         """Pausa una orden de trabajo en proceso."""
@@ -120,7 +151,7 @@ class OrdenTrabajo:
                          costo_real: Optional[float] = None) -> None:
         """Marca la orden como completada y registra la hora de finalización."""
         self.estado = EstadoOrden.COMPLETADA
-        self.fecha_fin = datetime.now().isoformat()
+        self.fecha_fin = ahora_iso()
         self.observaciones = observaciones
         
         if horas_reales is not None:
@@ -131,16 +162,40 @@ class OrdenTrabajo:
     def agregar_material(self, nombre: str, cantidad: float, unidad: str, 
                         costo_unitario: Optional[float] = None) -> None:
         """Agrega un material a la lista de materiales necesarios."""
-        material = {
+        self.agregar_materiales([{
             "nombre": nombre,
             "cantidad": cantidad,
             "unidad": unidad,
             "costo_unitario": costo_unitario
-        }
-        self.materiales.append(material)
+        }])
+    
+    def agregar_materiales(self, items: List[Dict[str, Union[str, float]]]) -> None:
+        """
+        Agrega varios materiales de una vez.
+        
+        El costo de los materiales con costo unitario se suma con math.fsum
+        y se acumula en costo_estimado una sola vez, en lugar de sumar cada
+        material por separado y arrastrar el error de redondeo.
+        
+        Args:
+            items: Diccionarios con nombre, cantidad, unidad y, opcionalmente,
+                costo_unitario
+        """
+        nuevos = [
+            {
+                "nombre": item["nombre"],
+                "cantidad": item["cantidad"],
+                "unidad": item["unidad"],
+                "costo_unitario": item.get("costo_unitario")
+            }
+            for item in items
+        ]
+        self.materiales.extend(nuevos)
         
-        # Actualizar costo estimado si se proporcionó el costo unitario
-        if costo_unitario is not None:
-            if self.costo_estimado is None:
-                self.costo_estimado = 0.0
-            self.costo_estimado += cantidad * costo_unitario
+        # Actualizar costo estimado si algún material trae costo unitario
+        costos = [
+            m["cantidad"] * m["costo_unitario"]
+            for m in nuevos if m["costo_unitario"] is not None
+        ]
+        if costos:
+            self.costo_estimado = (self.costo_estimado or 0.0) + math.fsum(costos)
@@ -39,16 +39,22 @@ def listar_activos():
 def listar_fallas():
     """Lista todas las fallas reportadas con opciones de filtrado."""
     try:
+        db_manager = current_app.db_manager
+        
         # Obtener parámetros de filtrado
         estado = request.args.get('estado', '')
         prioridad = request.args.get('prioridad', '')
         fecha_desde = request.args.get('fecha_desde', '')
         fecha_hasta = request.args.get('fecha_hasta', '')
         activo_id = request.args.get('activo_id', '')
+        limite = max(1, min(request.args.get('limite', 50, type=int), 500))
+        desde_fecha = request.args.get('desde_fecha')
+        desde_id = request.args.get('desde_id', type=int)
         
-        # Construir la consulta base
+        # Construir la consulta base con solo las columnas que muestra el listado
         query = """
-            SELECT f.*, a.nombre as nombre_activo 
+            SELECT f.falla_id, f.activo_id, f.descripcion, f.fecha_reporte,
+                   f.prioridad, f.estado, a.nombre as nombre_activo
             FROM fallas f
             LEFT JOIN activos a ON f.activo_id = a.activo_id
             WHERE 1=1
@@ -64,23 +70,40 @@ def listar_fallas():
             query += " AND f.prioridad = ?"
             params.append(int(prioridad))
             
+        # Comparar la columna sin envolverla en DATE() para que se use el índice;
+        # las fechas ISO-8601 se ordenan correctamente como texto
         if fecha_desde:
-            query += " AND DATE(f.fecha_reporte) >= ?"
+            query += " AND f.fecha_reporte >= ?"
             params.append(fecha_desde)
             
         if fecha_hasta:
-            query += " AND DATE(f.fecha_reporte) <= ?"
+            query += " AND f.fecha_reporte < DATE(?, '+1 day')"
             params.append(fecha_hasta)
             
         if activo_id:
             query += " AND f.activo_id = ?"
             params.append(int(activo_id))
         
-        # Ordenar por fecha de reporte descendente
-        query += " ORDER BY f.fecha_reporte DESC"
+        # Paginación por clave (fecha_reporte, falla_id): cada página continúa
+        # después de la última falla de la anterior, sin OFFSET
+        if desde_fecha and desde_id:
+            query += " AND (f.fecha_reporte, f.falla_id) < (?, ?)"
+            params.extend([desde_fecha, desde_id])
+        
+        # Ordenar por fecha de reporte descendente; se pide una fila de más
+        # para saber si existe una página siguiente
+        query += " ORDER BY f.fecha_reporte DESC, f.falla_id DESC LIMIT ?"
+        params.append(limite + 1)
         
         # Obtener las fallas filtradas
         fallas = db_manager.execute_query(query, tuple(params))
+        siguiente = None
+        if len(fallas) > limite:
+            fallas = fallas[:limite]
+            siguiente = {
+                'desde_fecha': fallas[-1]['fecha_reporte'],
+                'desde_id': fallas[-1]['falla_id']
+            }
         
         # Obtener lista de activos para el filtro
         activos = db_manager.execute_query("SELECT activo_id, nombre FROM activos ORDER BY nombre")
@@ -88,6 +111,7 @@ def listar_fallas():
         return render_template('fallas/lista.html', 
                              fallas=fallas, 
                              activos=activos,
+                             siguiente=siguiente,
                              filtros={
                                  'estado': estado,
                                  'prioridad': prioridad,
@@ -125,18 +149,8 @@ def listar_ordenes_trabajo():
 def api_kpis_activo(activo_id):
     """API para obtener los KPIs de un activo."""
     try:
-        db_manager = current_app.db_manager
-        fallas = db_manager.execute_query(
-            "SELECT * FROM fallas WHERE activo_id = ?",
-            (activo_id,)
-        )
-        
-        ordenes = db_manager.execute_query(
-            "SELECT * FROM ordenes_trabajo WHERE activo_id = ?",
-            (activo_id,)
-        )
-        
-        kpis = KPICalculator.calcular_kpis_activo(fallas, ordenes)
+        # Los agregados se calculan en SQLite; no hace falta traer cada fila
+        kpis = KPICalculator.sql_kpis_activo(current_app.db_manager, activo_id)
         return jsonify(kpis)
         
     except Exception as e:
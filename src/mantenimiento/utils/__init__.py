@@ -8,4 +8,4 @@ Este paquete proporciona utilidades para:
 - Funciones auxiliares
 """
 
-__all__ = ['database', 'kpi_calculator', 'data_loader']
+__all__ = ['database', 'kpi_calculator', 'data_loader', 'json_provider', 'clock', 'fs']
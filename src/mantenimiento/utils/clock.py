@@ -0,0 +1,71 @@
+"""
+Fuente de la hora actual para los modelos y cálculos.
+
+Dentro de una petición de Flask la hora se lee una sola vez y se guarda en
+``g``, de modo que todos los cambios hechos en la misma petición comparten
+marca de tiempo. ``congelar_reloj`` fija la hora explícitamente, por ejemplo
+en cargas masivas o pruebas.
+"""
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import date, datetime
+from typing import Iterator, Optional, Union
+
+try:
+    from flask import g, has_app_context
+except ImportError:  # Los modelos se pueden usar sin Flask
+    g = has_app_context = None
+
+# Hora fijada con congelar_reloj, en formato ISO
+_hora_congelada: ContextVar[Optional[str]] = ContextVar('hora_congelada', default=None)
+
+
+def ahora_iso() -> str:
+    """Devuelve la hora actual en formato ISO 8601."""
+    congelada = _hora_congelada.get()
+    if congelada is not None:
+        return congelada
+    
+    if has_app_context is not None and has_app_context():
+        if '_ahora_iso' not in g:
+            g._ahora_iso = datetime.now().isoformat()
+        return g._ahora_iso
+    
+    return datetime.now().isoformat()
+
+
+@contextmanager
+def congelar_reloj(momento: Optional[datetime] = None) -> Iterator[str]:
+    """
+    Fija la hora que devuelve ahora_iso dentro del bloque.
+    
+    Args:
+        momento: Hora a fijar; por defecto, la actual
+        
+    Yields:
+        La hora fijada en formato ISO
+    """
+    hora = (momento or datetime.now()).isoformat()
+    token = _hora_congelada.set(hora)
+    try:
+        yield hora
+    finally:
+        _hora_congelada.reset(token)
+
+
+def formatear_fecha(valor: Union[date, str, None], formato: str = '%d/%m/%Y') -> str:
+    """
+    Filtro de plantilla: da formato a una fecha guardada como texto ISO 8601.
+    
+    SQLite devuelve las fechas como texto; también acepta objetos date o
+    datetime. Un texto que no es ISO 8601 se muestra tal cual.
+    """
+    if not valor:
+        return ''
+    if isinstance(valor, str):
+        try:
+            valor = datetime.fromisoformat(valor)
+        except ValueError:
+            return valor
+    return valor.strftime(formato)
@@ -6,11 +6,14 @@ a las tablas correspondientes en la base de datos.
 """
 
 import csv
+from contextlib import nullcontext
+from operator import itemgetter
 from pathlib import Path
-from typing import Dict, List, Optional, Type, TypeVar, Any, Union, ClassVar
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Type, TypeVar, Any, Union, ClassVar, get_args, get_origin
 import logging
+import sys
+from functools import lru_cache
 from datetime import datetime
-import pandas as pd
 
 # Importar modelos
 from ..models.activo import Activo
@@ -23,11 +26,159 @@ logger = logging.getLogger(__name__)
 
 T = TypeVar('T')
 
+# Columnas con pocos valores distintos que se repiten en cada fila; se
+# internan al cargarlas para que todas las filas compartan el mismo objeto str
+COLUMNAS_CATEGORICAS = frozenset({'estado', 'tipo', 'criticidad'})
+
+
+@lru_cache(maxsize=None)
+def _campos_validos(modelo: type) -> frozenset:
+    """Campos que acepta el constructor del modelo, calculados una vez por clase."""
+    return frozenset(getattr(modelo, '__annotations__', {})) | {
+        a for a in dir(modelo) if not a.startswith('_')
+    }
+
+
+def _a_entero(valor: str) -> int:
+    """Convierte texto a int, aceptando también valores escritos como '3.0'."""
+    try:
+        return int(valor)
+    except ValueError:
+        return int(float(valor))
+
+
+def _convertidor(campo: str, tipo: Any) -> Optional[Callable[[str], Any]]:
+    """
+    Devuelve la función que convierte el texto de una celda al tipo del campo.
+    
+    Solo se convierten los campos numéricos (también si son Optional); las
+    columnas categóricas se internan y el resto se deja como texto.
+    """
+    if get_origin(tipo) is Union:
+        tipos = [t for t in get_args(tipo) if t is not type(None)]
+        tipo = tipos[0] if len(tipos) == 1 else None
+    if tipo is int:
+        return _a_entero
+    if tipo is float:
+        return float
+    if campo in COLUMNAS_CATEGORICAS:
+        return sys.intern
+    return None
+
+# Tabla destino de cada modelo; las columnas salen de su atributo _COLS
+TABLAS_MODELO = {
+    Activo: 'activos',
+    Falla: 'fallas',
+    OrdenTrabajo: 'ordenes_trabajo'
+}
+
 class DataLoader:
     """Clase para cargar datos desde archivos CSV a la base de datos."""
     
     @staticmethod
+    def _iterar_objetos(
+        filas: Iterable[tuple],
+        modelo: Type[T],
+        mapeo_campos: Optional[Dict[str, str]] = None
+    ) -> Iterator[Optional[T]]:
+        """
+        Convierte un flujo de filas en objetos del modelo.
+        
+        La primera fila es la cabecera. Las celdas de los campos int o float del
+        modelo se convierten a número; los campos vacíos o ausentes toman el
+        valor por defecto del modelo. Por cada fila que no puede convertirse
+        se registra el error y se genera None, para que el llamador pueda
+        contarla.
+        
+        Args:
+            filas: Filas del archivo, empezando por la cabecera
+            modelo: Clase del modelo al que se convertirán los datos
+            mapeo_campos: Diccionario que mapea nombres de columnas a campos del modelo
+            
+        Yields:
+            Un objeto del modelo por fila, o None si la fila no es válida
+        """
+        filas = iter(filas)
+        cabecera = next(filas, None) or ()
+        
+        # Resolver una sola vez qué columnas del archivo pasan al modelo
+        mapeo_campos = mapeo_campos or {}
+        nombres = ['' if nombre is None else str(nombre).strip() for nombre in cabecera]
+        columnas = [
+            (i, mapeo_campos.get(nombre, nombre))
+            for i, nombre in enumerate(nombres)
+        ]
+        validos = _campos_validos(modelo)
+        columnas = [(i, campo) for i, campo in columnas if campo in validos]
+        campos = [campo for _, campo in columnas]
+        
+        indices = [i for i, _ in columnas]
+        
+        # Extraer solo las columnas usadas con un itemgetter, en C; con un
+        # único índice itemgetter devuelve el valor suelto y no una tupla
+        if len(indices) > 1:
+            extraer = itemgetter(*indices)
+        else:
+            def extraer(fila):
+                return tuple(fila[i] for i in indices)
+        
+        # Conversión de cada columna según la anotación del modelo,
+        # resuelta una sola vez por archivo
+        anotaciones = getattr(modelo, '__annotations__', {})
+        convertidores = [
+            (j, conv) for j, campo in enumerate(campos)
+            if (conv := _convertidor(campo, anotaciones.get(campo))) is not None
+        ]
+        
+        for fila in filas:
+            try:
+                # Las celdas vacías ('' en CSV, None en Excel) no se pasan y el
+                # campo toma el valor por defecto del modelo; un 0 de Excel se conserva
+                valores = [None if v == '' else v for v in extraer(fila)]
+                for j, conv in convertidores:
+                    if valores[j] is not None:
+                        valores[j] = conv(valores[j])
+                objeto = modelo(**{
+                    campo: valor for campo, valor in zip(campos, valores)
+                    if valor is not None
+                })
+            except Exception as e:
+                logger.error("Error al crear instancia de %s: %s", modelo.__name__, e)
+                objeto = None
+            yield objeto
+    
+    @classmethod
+    def iterar_desde_csv(
+        cls,
+        archivo_csv: str, 
+        modelo: Type[T], 
+        mapeo_campos: Optional[Dict[str, str]] = None,
+        **kwargs
+    ) -> Iterator[T]:
+        """
+        Recorre un archivo CSV generando un objeto del modelo por fila.
+        
+        El archivo se lee a medida que se consumen los objetos, de modo que la
+        memoria usada no depende de su tamaño. Las filas que no pueden
+        convertirse en el modelo se registran y se omiten.
+        
+        Args:
+            archivo_csv: Ruta al archivo CSV
+            modelo: Clase del modelo al que se convertirán los datos
+            mapeo_campos: Diccionario que mapea nombres de columnas del CSV a campos del modelo
+            **kwargs: Parámetros de formato adicionales para csv.reader()
+            
+        Yields:
+            Objetos del modelo especificado
+        """
+        with open(archivo_csv, newline='', encoding='utf-8') as f:
+            for objeto in cls._iterar_objetos(csv.reader(f, **kwargs), modelo, mapeo_campos):
+                if objeto is not None:
+                    yield objeto
+    
+    @classmethod
     def cargar_desde_csv(
+        cls,
         archivo_csv: str, 
         modelo: Type[T], 
         mapeo_campos: Optional[Dict[str, str]] = None,
@@ -36,51 +187,31 @@ class DataLoader:
         """
         Carga datos desde un archivo CSV y los convierte en objetos del modelo especificado.
         
+        Las celdas vacías toman el valor por defecto del modelo y las de los
+        campos int o float se convierten a número; el resto llega como texto.
+        Para archivos grandes conviene ``iterar_desde_csv``, que no acumula
+        los objetos en una lista.
+        
         Args:
             archivo_csv: Ruta al archivo CSV
             modelo: Clase del modelo al que se convertirán los datos
             mapeo_campos: Diccionario que mapea nombres de columnas del CSV a campos del modelo
-            **kwargs: Argumentos adicionales para pd.read_csv()
+            **kwargs: Parámetros de formato adicionales para csv.reader()
             
         Returns:
             Lista de objetos del modelo especificado
         """
         if not Path(archivo_csv).exists():
-            logger.warning(f"El archivo {archivo_csv} no existe.")
+            logger.warning("El archivo %s no existe.", archivo_csv)
             return []
         
         try:
-            # Leer el archivo CSV con pandas
-            df = pd.read_csv(archivo_csv, **kwargs)
-            
-            # Aplicar mapeo de campos si se proporciona
-            if mapeo_campos:
-                df = df.rename(columns=mapeo_campos)
-            
-            # Convertir a lista de diccionarios
-            registros = df.to_dict('records')
-            
-            # Crear instancias del modelo
-            objetos = []
-            for registro in registros:
-                try:
-                    # Filtrar solo las claves que existen en el modelo
-                    campos_validos = {
-                        k: v for k, v in registro.items() 
-                        if hasattr(modelo, k) or k in modelo.__annotations__
-                    }
-                    
-                    # Crear instancia del modelo
-                    objeto = modelo(**campos_validos)
-                    objetos.append(objeto)
-                except Exception as e:
-                    logger.error(f"Error al crear instancia de {modelo.__name__}: {e}")
-            
-            logger.info(f"Cargados {len(objetos)} registros desde {archivo_csv}")
+            objetos = list(cls.iterar_desde_csv(archivo_csv, modelo, mapeo_campos, **kwargs))
+            logger.info("Cargados %d registros desde %s", len(objetos), archivo_csv)
             return objetos
             
         except Exception as e:
-            logger.error(f"Error al cargar datos desde {archivo_csv}: {e}")
+            logger.error("Error al cargar datos desde %s: %s", archivo_csv, e)
             return []
     
     @classmethod
@@ -163,16 +294,14 @@ class DataLoader:
             ruta_archivo = Path(directorio_datos) / archivo
             
             if not ruta_archivo.exists():
-                logger.warning(f"Archivo no encontrado: {ruta_archivo}")
+                logger.warning("Archivo no encontrado: %s", ruta_archivo)
                 continue
             
             # Cargar datos del archivo
             objetos = cls.cargar_desde_csv(
                 archivo_csv=str(ruta_archivo),
                 modelo=config['modelo'],
-                mapeo_campos=config['mapeo'],
-                parse_dates=True,
-                infer_datetime_format=True
+                mapeo_campos=config['mapeo']
             )
             
             # Almacenar resultados
@@ -181,14 +310,131 @@ class DataLoader:
         
         return resultados
     
+    @classmethod
+    def importar_archivo(
+        cls,
+        archivo: Union[str, Path],
+        modelo: Type[Any],
+        db_manager,
+        batch_size: int = 10000,
+        conn=None
+    ) -> Dict[str, int]:
+        """
+        Importa un archivo CSV o Excel (.xlsx) a la tabla del modelo por lotes.
+        
+        Cada fila se convierte en un objeto del modelo, igual que en
+        ``iterar_desde_csv``, y su ``to_row()`` se envía a ``bulk_insert`` en
+        lotes de ``batch_size``; la memoria usada depende del lote y no del
+        tamaño del archivo. Las columnas que no existen en el modelo se ignoran
+        y las filas que no pueden convertirse se cuentan como fallidas.
+        
+        Args:
+            archivo: Ruta al archivo subido
+            modelo: Clase del modelo destino (Activo, Falla u OrdenTrabajo)
+            db_manager: Instancia de DatabaseManager
+            batch_size: Número de filas por executemany
+            conn: Conexión de una transacción abierta con
+                ``db_manager.transaccion()``. Si la inserción falla solo se
+                deshacen las filas de este archivo
+            
+        Returns:
+            Diccionario con estadísticas de la operación
+        """
+        tabla = TABLAS_MODELO[modelo]
+        ruta = Path(archivo)
+        estadisticas = {'total': 0, 'exitosos': 0, 'fallidos': 0}
+        
+        def filas_validas(filas: Iterable[tuple]) -> Iterator[tuple]:
+            for objeto in cls._iterar_objetos(filas, modelo):
+                estadisticas['total'] += 1
+                if objeto is None:
+                    estadisticas['fallidos'] += 1
+                else:
+                    yield objeto.to_row()
+        
+        def insertar(filas: Iterable[tuple]) -> None:
+            try:
+                estadisticas['exitosos'] = db_manager.bulk_insert(
+                    tabla, modelo._COLS, filas_validas(filas), reemplazar=True,
+                    batch_size=batch_size, conn=conn
+                )
+            except Exception as e:
+                # bulk_insert ya deshizo las filas del archivo
+                logger.error("Error al importar %s en la tabla %s: %s", ruta, tabla, e)
+                estadisticas['fallidos'] = estadisticas['total']
+        
+        if ruta.suffix.lower() == '.xlsx':
+            # Importación diferida; read_only recorre la hoja sin cargarla entera
+            import openpyxl
+            
+            libro = openpyxl.load_workbook(ruta, read_only=True)
+            try:
+                insertar(libro.active.iter_rows(values_only=True))
+            finally:
+                libro.close()
+        else:
+            with open(ruta, newline='', encoding='utf-8') as f:
+                insertar(csv.reader(f))
+        
+        logger.info(
+            "Importadas %d de %d filas desde %s",
+            estadisticas['exitosos'], estadisticas['total'], ruta
+        )
+        return estadisticas
+    
+    @classmethod
+    def importar_datos_ejemplo(
+        cls,
+        directorio_datos: str,
+        db_manager
+    ) -> Dict[str, Dict[str, int]]:
+        """
+        Importa los CSV de ejemplo a sus tablas.
+        
+        Todas las tablas se cargan en una misma transacción, pero cada archivo
+        se inserta en su propio punto de guardado: si uno falla se registra el
+        error y el resto de archivos se conserva.
+        
+        Args:
+            directorio_datos: Directorio que contiene los archivos de ejemplo
+            db_manager: Instancia de DatabaseManager
+            
+        Returns:
+            Diccionario con las estadísticas de importación por tabla
+        """
+        archivos = {
+            'activos.csv': Activo,
+            'fallas.csv': Falla,
+            'ordenes_trabajo.csv': OrdenTrabajo
+        }
+        
+        resultados = {}
+        with db_manager.transaccion() as conn:
+            for archivo, modelo in archivos.items():
+                ruta_archivo = Path(directorio_datos) / archivo
+                if not ruta_archivo.exists():
+                    logger.warning("Archivo no encontrado: %s", ruta_archivo)
+                    continue
+                
+                resultados[TABLAS_MODELO[modelo]] = cls.importar_archivo(
+                    ruta_archivo, modelo, db_manager, conn=conn
+                )
+        
+        # Estadísticas al día para que el planificador use los índices
+        db_manager.analizar()
+        return resultados
+    
     @staticmethod
-    def insertar_en_bd(objetos: List[Any], db_manager) -> Dict[str, int]:
+    def insertar_en_bd(objetos: List[Any], db_manager, conn=None) -> Dict[str, int]:
         """
         Inserta una lista de objetos en la base de datos.
         
         Args:
             objetos: Lista de objetos a insertar
             db_manager: Instancia de DatabaseManager
+            conn: Conexión de una transacción abierta con
+                ``db_manager.transaccion()`` para agrupar varias cargas. Sin
+                ella, todos los objetos se confirman en una transacción propia
             
         Returns:
             Diccionario con estadísticas de la operación
@@ -196,28 +442,40 @@ class DataLoader:
         if not objetos:
             return {'total': 0, 'exitosos': 0, 'fallidos': 0}
         
-        exitosos = 0
+        # Agrupar las filas por tabla para insertarlas con un solo executemany
+        grupos: Dict[str, Dict[str, Any]] = {}
         fallidos = 0
         
         for obj in objetos:
-            try:
-                # Convertir el objeto a diccionario
-                datos = obj.to_dict()
-                
-                # Insertar en la base de datos
-                if hasattr(obj, 'activo_id') and obj.activo_id:
-                    # Actualizar si ya existe
-                    db_manager.actualizar_activo(obj.activo_id, datos)
-                else:
-                    # Insertar nuevo
-                    if isinstance(obj, Activo):
-                        db_manager.insert_activo(datos)
-                    # Agregar otros tipos de inserción según sea necesario
-                
-                exitosos += 1
-            except Exception as e:
-                logger.error(f"Error al insertar objeto en la base de datos: {e}")
+            modelo = type(obj)
+            tabla = TABLAS_MODELO.get(modelo)
+            if tabla is None:
+                logger.error("Tipo de objeto no soportado: %s", modelo.__name__)
                 fallidos += 1
+                continue
+            
+            # to_row() ya devuelve la tupla en el orden de las columnas
+            grupo = grupos.get(tabla)
+            if grupo is None:
+                grupo = grupos[tabla] = {'columnas': modelo._COLS, 'filas': []}
+            grupo['filas'].append(obj.to_row())
+        
+        # Con conn se usa la transacción del llamador; si no, todas las tablas
+        # se confirman con un único COMMIT. Cada bulk_insert usa un punto de
+        # guardado, así que un error solo descarta su tabla
+        exitosos = 0
+        contexto = nullcontext(conn) if conn is not None else db_manager.transaccion()
+        with contexto as conexion:
+            for tabla, grupo in grupos.items():
+                try:
+                    # Reemplazar si ya existe un registro con el mismo ID
+                    exitosos += db_manager.bulk_insert(
+                        tabla, grupo['columnas'], grupo['filas'], reemplazar=True,
+                        conn=conexion
+                    )
+                except Exception as e:
+                    logger.error("Error al insertar objetos en la tabla %s: %s", tabla, e)
+                    fallidos += len(grupo['filas'])
         
         return {
             'total': len(objetos),
@@ -6,12 +6,18 @@ incluyendo la creación de tablas, inserción, actualización y consulta de dato
 """
 
 import sqlite3
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from functools import lru_cache
+from itertools import islice
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Tuple, Union, Type, TypeVar, Callable, ClassVar
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple, Type, TypeVar, Callable, ClassVar
 import logging
 from datetime import datetime, date
 
 # Importar modelos
+from .fs import asegurar_directorio
 from ..models.activo import Activo
 from ..models.falla import Falla, EstadoFalla
 from ..models.orden_trabajo import OrdenTrabajo, EstadoOrden, TipoOrden
@@ -20,27 +26,125 @@ from ..models.orden_trabajo import OrdenTrabajo, EstadoOrden, TipoOrden
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Los Enum de los modelos se guardan por su valor, sin pasar por to_dict()
+for _enum in (EstadoFalla, EstadoOrden, TipoOrden):
+    sqlite3.register_adapter(_enum, lambda e: e.value)
+
+# Las fechas se guardan como texto ISO 8601, que ordena igual que la fecha;
+# al leerlas se devuelven como texto, igual que en las bases ya existentes
+sqlite3.register_adapter(datetime, datetime.isoformat)
+sqlite3.register_adapter(date, date.isoformat)
+
+
+@lru_cache(maxsize=None)
+def _sql_insert(tabla: str, columnas: Tuple[str, ...], reemplazar: bool) -> str:
+    """Construye una vez la sentencia INSERT para una tabla y sus columnas."""
+    verbo = "INSERT OR REPLACE" if reemplazar else "INSERT"
+    return f"{verbo} INTO {tabla} ({', '.join(columnas)}) VALUES ({', '.join('?' * len(columnas))})"
+
+
+# Hilo para las copias de seguridad en segundo plano; una sola a la vez
+_respaldos = ThreadPoolExecutor(max_workers=1, thread_name_prefix='respaldo-bd')
+
 class DatabaseManager:
     """Clase para gestionar la conexión y operaciones con la base de datos."""
     
-    def __init__(self, db_path: str = "mantenimiento.db"):
+    # Versión del esquema guardada en PRAGMA user_version. Incrementarla al
+    # añadir tablas o índices para que _create_tables vuelva a ejecutarse.
+    SCHEMA_VERSION = 3
+    
+    # Sentencias preparadas que sqlite3 conserva por conexión, indexadas por
+    # el texto SQL; las consultas se escriben como literales para reutilizarlas
+    CACHED_STATEMENTS = 256
+    
+    # Páginas copiadas en cada paso de backup(); entre paso y paso se libera
+    # el bloqueo de lectura y otras conexiones pueden seguir trabajando
+    BACKUP_PAGES = 1024
+    
+    # Texto SQL ya construido por combinación de columnas, para que el mismo
+    # patrón de actualización o filtro produzca siempre la misma cadena y se
+    # aproveche la caché de sentencias preparadas de la conexión
+    _update_sql_cache: ClassVar[Dict[tuple, str]] = {}
+    _filtro_sql_cache: ClassVar[Dict[tuple, str]] = {}
+    
+    def __init__(self, db_path: str = "mantenimiento.db", synchronous: str = "NORMAL"):
         """
         Inicializa el gestor de base de datos.
         
         Args:
             db_path: Ruta al archivo de base de datos SQLite.
+            synchronous: Valor de PRAGMA synchronous. Con WAL, NORMAL solo
+                sincroniza en los checkpoints; FULL sincroniza cada commit.
+            
+        Las tablas no se crean aquí: se crean con el comando ``flask init-db``
+        o llamando explícitamente a ``_create_tables()``.
         """
         self.db_path = db_path
-        self._create_tables()
+        self.synchronous = synchronous
+        # Cada hilo usa su propia conexión; sqlite3 no permite compartirlas
+        self._local = threading.local()
+    
+    def init_app(self, app) -> None:
+        """
+        Configura el gestor con los valores de una aplicación Flask.
+        
+        Toma la ruta de ``DATABASE`` y el valor de ``SQLITE_SYNCHRONOUS``,
+        registra el cierre de la conexión al terminar cada petición y deja el
+        gestor disponible como ``app.db_manager``. Cada aplicación debe usar
+        su propia instancia: las conexiones abiertas son las de ``db_path``.
+        
+        Args:
+            app: Aplicación Flask
+        """
+        self.close_connection()
+        self.db_path = app.config.get('DATABASE', self.db_path)
+        self.synchronous = app.config.get('SQLITE_SYNCHRONOUS', self.synchronous)
+        app.teardown_appcontext(self.close_connection)
+        app.db_manager = self
     
     def _get_connection(self) -> sqlite3.Connection:
-        """Establece y devuelve una conexión a la base de datos."""
+        """
+        Devuelve la conexión del hilo actual, abriéndola si hace falta.
+        
+        La conexión trabaja en modo autocommit (``isolation_level=None``): cada
+        sentencia suelta se confirma sola y las escrituras de varias sentencias
+        deben abrir su propia transacción con BEGIN o ``transaccion()``. Como
+        la conexión es compartida dentro del hilo, no debe cerrarse ni usarse
+        como gestor de contexto; se cierra con ``close_connection()``.
+        """
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._local.conn = self._conectar()
+        return conn
+    
+    def close_connection(self, *args) -> None:
+        """
+        Cierra la conexión del hilo actual, si hay una abierta.
+        
+        Acepta y descarta argumentos para poder registrarse directamente con
+        ``teardown_appcontext`` de Flask.
+        """
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            self._local.conn = None
+            conn.close()
+    
+    def _conectar(self) -> sqlite3.Connection:
+        """Abre una conexión nueva y aplica los PRAGMA de rendimiento."""
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = sqlite3.connect(
+                self.db_path,
+                cached_statements=self.CACHED_STATEMENTS,
+                isolation_level=None
+            )
             conn.row_factory = sqlite3.Row  # Para acceder a las columnas por nombre
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(f"PRAGMA synchronous={self.synchronous}")
+            conn.execute("PRAGMA temp_store=MEMORY")
+            conn.execute("PRAGMA cache_size=-65536")
             return conn
         except sqlite3.Error as e:
-            logger.error(f"Error al conectar a la base de datos: {e}")
+            logger.error("Error al conectar a la base de datos: %s", e)
             raise
     
     def _create_tables(self) -> None:
@@ -115,14 +219,63 @@ class DatabaseManager:
                 fecha_creacion TEXT DEFAULT CURRENT_TIMESTAMP,
                 FOREIGN KEY (ot_id) REFERENCES ordenes_trabajo (ot_id)
             )
+            """,
+            # Índice para los filtros y el orden del listado de fallas; al
+            # empezar por activo_id también sirve a las uniones y consultas
+            # por activo
+            """
+            CREATE INDEX IF NOT EXISTS idx_fallas_filtro
+            ON fallas (activo_id, estado, prioridad, fecha_reporte DESC)
+            """,
+            # Listado de fallas sin filtro de activo: orden y paginación por
+            # fecha, y filtros por estado y prioridad
+            """
+            CREATE INDEX IF NOT EXISTS idx_fallas_reporte
+            ON fallas (fecha_reporte DESC, falla_id DESC)
+            """,
+            """
+            CREATE INDEX IF NOT EXISTS idx_fallas_estado
+            ON fallas (estado, prioridad, fecha_reporte DESC, falla_id DESC)
+            """,
+            # Órdenes de un activo y listado general, ambos por fecha de creación
+            """
+            CREATE INDEX IF NOT EXISTS idx_ordenes_activo
+            ON ordenes_trabajo (activo_id, fecha_creacion DESC)
+            """,
+            """
+            CREATE INDEX IF NOT EXISTS idx_ordenes_creacion
+            ON ordenes_trabajo (fecha_creacion DESC)
+            """,
+            # Filtro por estado de get_activos, ya ordenado por nombre
+            """
+            CREATE INDEX IF NOT EXISTS idx_activos_estado
+            ON activos (estado, nombre)
+            """,
+            # Materiales de una orden de trabajo
+            """
+            CREATE INDEX IF NOT EXISTS idx_materiales_ot
+            ON materiales_ot (ot_id)
             """
         ]
         
-        with self._get_connection() as conn:
-            cursor = conn.cursor()
+        conn = self._get_connection()
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        if version >= self.SCHEMA_VERSION:
+            return
+        
+        with self.transaccion() as conn:
             for script in sql_scripts:
-                cursor.execute(script)
-            conn.commit()
+                conn.execute(script)
+            conn.execute(f"PRAGMA user_version = {self.SCHEMA_VERSION}")
+        self.analizar()
+    
+    def analizar(self) -> None:
+        """
+        Actualiza las estadísticas que usa el planificador para elegir índices.
+        
+        Conviene llamarlo tras crear índices o cargar muchas filas.
+        """
+        self._get_connection().execute("ANALYZE")
     
     def execute_query(self, query: str, params: tuple = ()) -> List[sqlite3.Row]:
         """
@@ -136,12 +289,29 @@ class DatabaseManager:
             Lista de filas resultantes
         """
         try:
-            with self._get_connection() as conn:
-                cursor = conn.cursor()
-                cursor.execute(query, params)
-                return cursor.fetchall()
+            return self._get_connection().execute(query, params).fetchall()
         except sqlite3.Error as e:
-            logger.error(f"Error al ejecutar consulta: {e}")
+            logger.error("Error al ejecutar consulta: %s", e)
+            raise
+    
+    def execute_queries(self, consultas: List[Tuple[str, tuple]]) -> List[List[sqlite3.Row]]:
+        """
+        Ejecuta varias consultas SELECT sobre una misma conexión.
+        
+        Útil para las vistas de detalle, que necesitan varios conjuntos de
+        resultados independientes y antes abrían una conexión por consulta.
+        
+        Args:
+            consultas: Lista de tuplas (consulta, parámetros)
+            
+        Returns:
+            Lista con las filas resultantes de cada consulta, en el mismo orden
+        """
+        try:
+            cursor = self._get_connection().cursor()
+            return [cursor.execute(query, params).fetchall() for query, params in consultas]
+        except sqlite3.Error as e:
+            logger.error("Error al ejecutar consultas: %s", e)
             raise
     
     def execute_update(self, query: str, params: tuple = ()) -> int:
@@ -156,16 +326,101 @@ class DatabaseManager:
             ID de la fila insertada o número de filas afectadas
         """
         try:
-            with self._get_connection() as conn:
-                cursor = conn.cursor()
-                cursor.execute(query, params)
-                conn.commit()
-                return cursor.lastrowid or cursor.rowcount
+            # En autocommit la sentencia se confirma sola; dentro de
+            # transaccion() forma parte de la transacción abierta
+            cursor = self._get_connection().execute(query, params)
+            # lastrowid pertenece a la conexión, que ahora se reutiliza: solo
+            # es el ID de esta sentencia si fue una inserción
+            if query.lstrip().upper().startswith(('INSERT', 'REPLACE')):
+                return cursor.lastrowid
+            return cursor.rowcount
         except sqlite3.Error as e:
-            logger.error(f"Error al ejecutar actualización: {e}")
+            logger.error("Error al ejecutar actualización: %s", e)
+            raise
+    
+    @contextmanager
+    def transaccion(self) -> Iterator[sqlite3.Connection]:
+        """
+        Abre una transacción de escritura sobre una única conexión.
+        
+        Usa BEGIN IMMEDIATE para reservar el bloqueo de escritura desde el
+        principio; todas las sentencias ejecutadas con la conexión devuelta se
+        confirman juntas al salir del bloque o se deshacen si hay un error.
+        Si el hilo ya tiene una transacción abierta, el bloque se une a ella.
+        
+        Yields:
+            Conexión con la transacción abierta
+        """
+        conn = self._get_connection()
+        if conn.in_transaction:
+            yield conn
+            return
+        
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+            conn.commit()
+        except BaseException:
             conn.rollback()
             raise
     
+    def bulk_insert(
+        self,
+        table: str,
+        cols: List[str],
+        rows: Iterable[tuple],
+        reemplazar: bool = False,
+        batch_size: int = 10000,
+        conn: Optional[sqlite3.Connection] = None
+    ) -> int:
+        """
+        Inserta varias filas en una tabla mediante executemany por lotes.
+        
+        Args:
+            table: Nombre de la tabla destino
+            cols: Columnas a insertar, en el mismo orden que las tuplas de rows
+            rows: Tuplas con los valores de cada fila
+            reemplazar: Si es True usa INSERT OR REPLACE para actualizar las
+                filas cuya clave primaria ya exista
+            batch_size: Número de filas enviadas en cada executemany
+            conn: Conexión con una transacción ya abierta (ver ``transaccion``).
+                Si se omite, la inserción se hace en una transacción propia.
+            
+        Returns:
+            Número de filas insertadas
+        """
+        query = _sql_insert(table, tuple(cols), reemplazar)
+        
+        def insertar(conexion: sqlite3.Connection) -> int:
+            total = 0
+            filas = iter(rows)
+            while True:
+                lote = list(islice(filas, batch_size))
+                if not lote:
+                    return total
+                conexion.executemany(query, lote)
+                total += len(lote)
+        
+        try:
+            if conn is None:
+                with self.transaccion() as conexion:
+                    return insertar(conexion)
+            
+            # Dentro de una transacción ajena, un punto de guardado permite
+            # deshacer solo las filas de esta tabla si algo falla
+            conn.execute("SAVEPOINT bulk_insert")
+            try:
+                total = insertar(conn)
+            except sqlite3.Error:
+                conn.execute("ROLLBACK TO bulk_insert")
+                raise
+            finally:
+                conn.execute("RELEASE bulk_insert")
+            return total
+        except sqlite3.Error as e:
+            logger.error("Error en la inserción masiva en %s: %s", table, e)
+            raise
+    
     def insert_activo(self, activo_data: Dict[str, Any]) -> int:
         """
         Inserta un nuevo activo en la base de datos.
@@ -224,11 +479,17 @@ class DatabaseManager:
         if not update_data:
             return False
             
-        set_clause = ", ".join([f"{k} = ?" for k in update_data.keys()])
-        set_clause += ", fecha_actualizacion = CURRENT_TIMESTAMP"
-        
-        query = f"UPDATE activos SET {set_clause} WHERE activo_id = ?"
-        params = list(update_data.values()) + [activo_id]
+        # Las columnas se ordenan para que el orden del diccionario no cambie el SQL
+        key = tuple(sorted(update_data))
+        query = self._update_sql_cache.get(key)
+        if query is None:
+            set_clause = ", ".join(f"{k} = ?" for k in key)
+            query = self._update_sql_cache.setdefault(
+                key,
+                f"UPDATE activos SET {set_clause}, fecha_actualizacion = CURRENT_TIMESTAMP "
+                "WHERE activo_id = ?"
+            )
+        params = [update_data[k] for k in key] + [activo_id]
         
         try:
             rows_affected = self.execute_update(query, tuple(params))
@@ -236,7 +497,7 @@ class DatabaseManager:
         except sqlite3.Error:
             return False
     
-    def get_activos(self, filtros: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+    def get_activos(self, filtros: Optional[Dict[str, Any]] = None) -> List[sqlite3.Row]:
         """
         Obtiene una lista de activos con filtros opcionales.
         
@@ -244,24 +505,112 @@ class DatabaseManager:
             filtros: Diccionario con filtros a aplicar (ej: {'estado': 'Activo'})
             
         Returns:
-            Lista de diccionarios con los datos de los activos
+            Lista de filas (sqlite3.Row) con los datos de los activos; admiten
+            acceso por nombre de columna y ``dict(fila)`` si se necesita un dict
         """
-        query = "SELECT * FROM activos"
-        params = []
+        key = tuple(sorted(k for k, v in (filtros or {}).items() if v is not None))
+        query = self._filtro_sql_cache.get(key)
+        if query is None:
+            where = " WHERE " + " AND ".join(f"{k} = ?" for k in key) if key else ""
+            query = self._filtro_sql_cache.setdefault(
+                key, f"SELECT * FROM activos{where} ORDER BY nombre"
+            )
+        return self.execute_query(query, tuple(filtros[k] for k in key))
+    
+    def kpis_activo(self, activo_id: int) -> Dict[str, Any]:
+        """
+        Obtiene los agregados necesarios para calcular los KPIs de un activo.
+        
+        Las sumas, promedios y conteos se resuelven en SQLite, de modo que solo
+        se transfiere una fila por tabla en lugar de todo el historial.
         
-        if filtros:
-            conditions = []
-            for key, value in filtros.items():
-                if value is not None:
-                    conditions.append(f"{key} = ?")
-                    params.append(value)
+        Args:
+            activo_id: ID del activo
             
-            if conditions:
-                query += " WHERE " + " AND ".join(conditions)
+        Returns:
+            Diccionario con los agregados de fallas y órdenes de trabajo
+            (ver KPICalculator.calcular_kpis_desde_agregados)
+        """
+        fallas, ordenes = self.execute_queries([
+            (
+                """
+                SELECT COUNT(*) AS num_fallas,
+                       COUNT(julianday(fecha_reporte)) AS num_fechas,
+                       MIN(julianday(fecha_reporte)) AS primera_falla,
+                       MAX(julianday(fecha_reporte)) AS ultima_falla,
+                       AVG(tiempo_fuera_servicio_h) AS mttr_horas,
+                       SUM(tiempo_fuera_servicio_h) AS tiempo_total_fuera_servicio
+                FROM fallas
+                WHERE activo_id = ? AND estado IN ('Resuelta', 'Cerrada', 'COMPLETADA')
+                """,
+                (activo_id,)
+            ),
+            (
+                """
+                SELECT COUNT(*) AS num_ordenes,
+                       SUM(tipo IN ('Preventivo', 'PREVENTIVO', 'preventivo')) AS num_preventivos,
+                       SUM(
+                           tipo IN ('Preventivo', 'PREVENTIVO', 'preventivo')
+                           AND estado IN ('Completada', 'COMPLETADA')
+                           AND julianday(fecha_fin) <= julianday(fecha_programada) + 1
+                       ) AS preventivos_a_tiempo,
+                       SUM(costo_real) AS costo_total
+                FROM ordenes_trabajo
+                WHERE activo_id = ?
+                """,
+                (activo_id,)
+            )
+        ])
+        return {**dict(fallas[0]), **dict(ordenes[0])}
+    
+    def kpis_por_activo(self) -> Dict[int, Dict[str, Any]]:
+        """
+        Obtiene los agregados de KPIs de todos los activos en dos consultas.
+        
+        Equivale a llamar a ``kpis_activo`` para cada activo, pero agrupando
+        con GROUP BY en lugar de una ida y vuelta por activo.
         
-        query += " ORDER BY nombre"
-        results = self.execute_query(query, tuple(params))
-        return [dict(row) for row in results]
+        Returns:
+            Diccionario activo_id -> agregados (mismas claves que kpis_activo);
+            los activos sin fallas ni órdenes no aparecen
+        """
+        fallas, ordenes = self.execute_queries([
+            (
+                """
+                SELECT activo_id,
+                       COUNT(*) AS num_fallas,
+                       COUNT(julianday(fecha_reporte)) AS num_fechas,
+                       MIN(julianday(fecha_reporte)) AS primera_falla,
+                       MAX(julianday(fecha_reporte)) AS ultima_falla,
+                       AVG(tiempo_fuera_servicio_h) AS mttr_horas,
+                       SUM(tiempo_fuera_servicio_h) AS tiempo_total_fuera_servicio
+                FROM fallas
+                WHERE estado IN ('Resuelta', 'Cerrada', 'COMPLETADA')
+                GROUP BY activo_id
+                """,
+                ()
+            ),
+            (
+                """
+                SELECT activo_id,
+                       COUNT(*) AS num_ordenes,
+                       SUM(tipo IN ('Preventivo', 'PREVENTIVO', 'preventivo')) AS num_preventivos,
+                       SUM(
+                           tipo IN ('Preventivo', 'PREVENTIVO', 'preventivo')
+                           AND estado IN ('Completada', 'COMPLETADA')
+                           AND julianday(fecha_fin) <= julianday(fecha_programada) + 1
+                       ) AS preventivos_a_tiempo,
+                       SUM(costo_real) AS costo_total
+                FROM ordenes_trabajo
+                GROUP BY activo_id
+                """,
+                ()
+            )
+        ])
+        agregados: Dict[int, Dict[str, Any]] = {}
+        for fila in (*fallas, *ordenes):
+            agregados.setdefault(fila['activo_id'], {}).update(dict(fila))
+        return agregados
     
     # Métodos similares para fallas y órdenes de trabajo...
     
@@ -277,20 +626,43 @@ class DatabaseManager:
         """
         try:
             # Crear directorio de respaldo si no existe
-            Path(backup_dir).mkdir(parents=True, exist_ok=True)
+            asegurar_directorio(str(backup_dir))
             
             # Generar nombre de archivo con timestamp
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
             backup_path = Path(backup_dir) / f"mantenimiento_backup_{timestamp}.db"
             
-            # Crear copia de la base de datos
-            with self._get_connection() as src_conn:
-                with sqlite3.connect(backup_path) as dest_conn:
-                    src_conn.backup(dest_conn)
+            # Copiar por lotes de páginas en lugar de todo en una sola llamada
+            dest_conn = sqlite3.connect(backup_path, isolation_level=None)
+            try:
+                self._get_connection().backup(dest_conn, pages=self.BACKUP_PAGES, sleep=0)
+            finally:
+                dest_conn.close()
             
-            logger.info(f"Copia de seguridad creada en: {backup_path}")
+            logger.info("Copia de seguridad creada en: %s", backup_path)
             return str(backup_path)
             
         except Exception as e:
-            logger.error(f"Error al crear copia de seguridad: {e}")
+            logger.error("Error al crear copia de seguridad: %s", e)
             raise
+    
+    def backup_database_async(self, backup_dir: str = "backups") -> "Future[str]":
+        """
+        Crea una copia de seguridad en un hilo aparte.
+        
+        La copia usa su propia conexión, que se cierra al terminar, y no
+        bloquea al hilo que la solicita.
+        
+        Args:
+            backup_dir: Directorio donde guardar la copia de seguridad
+            
+        Returns:
+            Future cuyo resultado es la ruta al archivo creado
+        """
+        def respaldar() -> str:
+            try:
+                return self.backup_database(backup_dir)
+            finally:
+                self.close_connection()
+        
+        return _respaldos.submit(respaldar)
@@ -0,0 +1,25 @@
+"""
+Utilidades del sistema de archivos.
+"""
+
+import os
+from functools import lru_cache
+
+
+@lru_cache(maxsize=None)
+def asegurar_directorio(ruta: str) -> str:
+    """
+    Crea el directorio (y sus padres) si no existe.
+    
+    El resultado se memoriza por ruta, de modo que solo la primera llamada
+    del proceso toca el sistema de archivos. Si la creación falla, la
+    excepción se propaga y no se memoriza nada.
+    
+    Args:
+        ruta: Ruta del directorio
+        
+    Returns:
+        La misma ruta, para poder encadenar la llamada
+    """
+    os.makedirs(ruta, exist_ok=True)
+    return ruta
@@ -0,0 +1,43 @@
+"""
+Proveedor JSON de Flask basado en orjson.
+
+orjson es una dependencia opcional: si está instalado, ``configurar_json``
+hace que ``jsonify`` y ``request.get_json`` lo usen en lugar del módulo
+``json`` de la biblioteca estándar; si no, la aplicación queda como estaba.
+"""
+
+from typing import Any
+
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # orjson es opcional
+    orjson = None
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """Serializa con orjson y recurre al proveedor estándar para lo demás."""
+    
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        # Flask pide separadores compactos o sangría; orjson ya es compacto
+        kwargs.pop('separators', None)
+        opciones = orjson.OPT_NON_STR_KEYS
+        if kwargs.pop('indent', None):
+            opciones |= orjson.OPT_INDENT_2
+        if kwargs.pop('sort_keys', self.sort_keys):
+            opciones |= orjson.OPT_SORT_KEYS
+        if kwargs:
+            return super().dumps(obj, **kwargs)
+        return orjson.dumps(obj, default=self.default, option=opciones).decode()
+    
+    def loads(self, s: Any, **kwargs: Any) -> Any:
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+
+def configurar_json(app) -> None:
+    """Instala OrjsonProvider en la aplicación si orjson está disponible."""
+    if orjson is not None:
+        app.json = OrjsonProvider(app)
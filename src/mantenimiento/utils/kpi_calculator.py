@@ -9,14 +9,36 @@ Este módulo proporciona funciones para calcular métricas clave de mantenimient
 - Costos de mantenimiento
 """
 
+import logging
+from collections import Counter
 from datetime import datetime, timedelta
+from statistics import fmean
 from typing import Dict, List, Optional, Tuple, Union, Any, ClassVar
-import numpy as np
-import pandas as pd
 from ..models.activo import Activo
 from ..models.falla import Falla, EstadoFalla
 from ..models.orden_trabajo import OrdenTrabajo, EstadoOrden, TipoOrden
 
+logger = logging.getLogger(__name__)
+
+# Valores de texto que cuentan en cada categoría; frozenset para que cada
+# comprobación sea una búsqueda por hash en lugar de recorrer una lista
+_ESTADOS_FALLA_RESUELTA = frozenset({'Resuelta', 'Cerrada', 'COMPLETADA'})
+_TIPOS_PREVENTIVO = frozenset({'Preventivo', 'PREVENTIVO', 'preventivo'})
+_ESTADOS_ORDEN_COMPLETADA = frozenset({'Completada', 'COMPLETADA'})
+
+def _como_datetime(valor: Union[datetime, str]) -> datetime:
+    """Acepta fechas como datetime o en texto ISO 8601."""
+    return valor if isinstance(valor, datetime) else datetime.fromisoformat(valor)
+
+def _fecha_o_none(valor: Union[datetime, str, None]) -> Optional[datetime]:
+    """Como _como_datetime, pero devuelve None si la fecha falta o no es válida."""
+    if valor is None:
+        return None
+    try:
+        return _como_datetime(valor)
+    except (ValueError, TypeError):
+        return None
+
 class KPICalculator:
     """Clase para calcular métricas clave de mantenimiento."""
     
@@ -26,28 +48,21 @@ class KPICalculator:
         Calcula el MTBF (Mean Time Between Failures) en horas.
         
         Args:
-            fechas_fallas: Lista de fechas de fallas ordenadas de más antigua a más reciente
+            fechas_fallas: Lista de fechas de fallas, en cualquier orden
             
         Returns:
             Tupla con (MTBF en horas, número de intervalos)
         """
         if len(fechas_fallas) < 2:
             return 0.0, 0
-            
-        # Ordenar fechas por si acaso no vienen ordenadas
-        fechas_ordenadas = sorted(fechas_fallas)
-        
-        # Calcular diferencias entre fallas consecutivas (en segundos)
-        diferencias = []
-        for i in range(1, len(fechas_ordenadas)):
-            delta = fechas_ordenadas[i] - fechas_ordenadas[i-1]
-            diferencias.append(delta.total_seconds() / 3600)  # Convertir a horas
         
-        if not diferencias:
-            return 0.0, 0
-            
-        mtbf = sum(diferencias) / len(diferencias)
-        return mtbf, len(diferencias)
+        # El promedio de los intervalos entre fallas consecutivas es una suma
+        # telescópica: (última - primera) / (n - 1). Basta con el mínimo y el
+        # máximo, sin ordenar ni construir la lista de diferencias.
+        num_intervalos = len(fechas_fallas) - 1
+        delta = max(fechas_fallas) - min(fechas_fallas)
+        mtbf = delta.total_seconds() / 3600 / num_intervalos  # Convertir a horas
+        return mtbf, num_intervalos
     
     @staticmethod
     def calcular_mttr(tiempos_reparacion: List[float]) -> float:
@@ -62,8 +77,9 @@ class KPICalculator:
         """
         if not tiempos_reparacion:
             return 0.0
-            
-        return sum(tiempos_reparacion) / len(tiempos_reparacion)
+        
+        # fmean acumula en C sobre cualquier iterable, sin sum() + len()
+        return fmean(tiempos_reparacion)
     
     @staticmethod
     def calcular_disponibilidad(mtbf: float, mttr: float) -> float:
@@ -103,15 +119,22 @@ class KPICalculator:
         # Filtrar solo fallas resueltas/cerradas para MTBF/MTTR
         fallas_resueltas = [
             f for f in fallas 
-            if f.get('estado') in ['Resuelta', 'Cerrada', 'COMPLETADA']
+            if f.get('estado') in _ESTADOS_FALLA_RESUELTA
         ]
         
-        # Calcular MTBF
+        # Calcular MTBF; cada fecha se normaliza a datetime (en la base son
+        # texto ISO 8601) y las vacías o que no se pueden convertir se omiten
+        valores_fecha = [
+            f['fecha_reporte'] for f in fallas_resueltas if f.get('fecha_reporte')
+        ]
         fechas_fallas = [
-            datetime.fromisoformat(f['fecha_reporte']) 
-            for f in fallas_resueltas
-            if 'fecha_reporte' in f
+            fecha for fecha in map(_fecha_o_none, valores_fecha) if fecha is not None
         ]
+        if len(fechas_fallas) < len(valores_fecha):
+            logger.warning(
+                "Se omitieron %d fechas de reporte no válidas al calcular el MTBF",
+                len(valores_fecha) - len(fechas_fallas)
+            )
         mtbf, num_intervalos = cls.calcular_mtbf(fechas_fallas)
         
         # Calcular MTTR
@@ -125,35 +148,32 @@ class KPICalculator:
         # Calcular disponibilidad
         disponibilidad = cls.calcular_disponibilidad(mtbf, mttr) if mtbf > 0 else 1.0
         
-        # Calcular cumplimiento de mantenimiento preventivo (si hay datos)
+        # Calcular cumplimiento de mantenimiento preventivo y costos (si hay
+        # datos) en una sola pasada sobre las órdenes; las fechas solo se
+        # convierten para los preventivos completados
         cumplimiento_preventivo = None
-        if ordenes_trabajo:
-            preventivos = [
-                ot for ot in ordenes_trabajo 
-                if ot.get('tipo') in ['Preventivo', 'PREVENTIVO', 'preventivo']
-            ]
-            
-            if preventivos:
-                completados_a_tiempo = sum(
-                    1 for ot in preventivos 
-                    if ot.get('estado') in ['Completada', 'COMPLETADA'] and
-                       ot.get('fecha_fin') and 
-                       ot.get('fecha_programada') and
-                       datetime.fromisoformat(ot['fecha_fin']) <= 
-                       datetime.fromisoformat(ot['fecha_programada']) + timedelta(days=1)
-                )
-                
-                if preventivos:
-                    cumplimiento_preventivo = (completados_a_tiempo / len(preventivos)) * 100
-        
-        # Calcular costos (si hay datos)
         costo_total = 0.0
         if ordenes_trabajo:
-            costo_total = sum(
-                ot.get('costo_real', 0) or 0 
-                for ot in ordenes_trabajo 
-                if ot.get('costo_real') is not None
-            )
+            num_preventivos = 0
+            completados_a_tiempo = 0
+            for ot in ordenes_trabajo:
+                costo = ot.get('costo_real')
+                if costo:
+                    costo_total += costo
+                
+                if ot.get('tipo') not in _TIPOS_PREVENTIVO:
+                    continue
+                num_preventivos += 1
+                fecha_fin = ot.get('fecha_fin')
+                fecha_programada = ot.get('fecha_programada')
+                if (ot.get('estado') in _ESTADOS_ORDEN_COMPLETADA and fecha_fin and
+                        fecha_programada and
+                        _como_datetime(fecha_fin) <=
+                        _como_datetime(fecha_programada) + timedelta(days=1)):
+                    completados_a_tiempo += 1
+            
+            if num_preventivos:
+                cumplimiento_preventivo = (completados_a_tiempo / num_preventivos) * 100
         
         return {
             'mtbf_horas': mtbf,
@@ -166,6 +186,85 @@ class KPICalculator:
             'ultima_actualizacion': datetime.now().isoformat()
         }
     
+    @classmethod
+    def calcular_kpis_desde_agregados(cls, agregados: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Calcula los KPIs de un activo a partir de agregados obtenidos por SQL.
+        
+        El MTBF es el promedio de los intervalos entre fallas consecutivas, que
+        equivale a (última - primera) / (n - 1), por lo que basta con el mínimo,
+        el máximo y el número de fechas.
+        
+        Args:
+            agregados: Resultado de DatabaseManager.kpis_activo
+            
+        Returns:
+            Diccionario con los mismos KPIs que calcular_kpis_activo
+        """
+        num_fechas = agregados.get('num_fechas') or 0
+        if num_fechas >= 2:
+            num_intervalos = num_fechas - 1
+            mtbf = (agregados['ultima_falla'] - agregados['primera_falla']) * 24 / num_intervalos
+        else:
+            mtbf, num_intervalos = 0.0, 0
+        
+        mttr = agregados.get('mttr_horas') or 0.0
+        disponibilidad = cls.calcular_disponibilidad(mtbf, mttr) if mtbf > 0 else 1.0
+        
+        cumplimiento_preventivo = None
+        num_preventivos = agregados.get('num_preventivos') or 0
+        if num_preventivos:
+            cumplimiento_preventivo = (agregados.get('preventivos_a_tiempo') or 0) / num_preventivos * 100
+        
+        return {
+            'mtbf_horas': mtbf,
+            'mttr_horas': mttr,
+            'disponibilidad': disponibilidad,
+            'num_fallas': agregados.get('num_fallas') or 0,
+            'num_intervalos_mtbf': num_intervalos,
+            'cumplimiento_preventivo': cumplimiento_preventivo,
+            'costo_total_mantenimiento': agregados.get('costo_total') or 0.0,
+            'ultima_actualizacion': datetime.now().isoformat()
+        }
+    
+    @classmethod
+    def sql_kpis_activo(cls, db_manager, activo_id: int) -> Dict[str, Any]:
+        """
+        Calcula los KPIs de un activo agregando en SQLite.
+        
+        Solo viajan a Python unos pocos valores escalares en lugar de todas las
+        fallas y órdenes del activo; calcular_kpis_activo queda para cálculos
+        sobre filas ya cargadas.
+        
+        Args:
+            db_manager: Instancia de DatabaseManager
+            activo_id: ID del activo
+            
+        Returns:
+            Diccionario con los mismos KPIs que calcular_kpis_activo
+        """
+        return cls.calcular_kpis_desde_agregados(db_manager.kpis_activo(activo_id))
+    
+    @classmethod
+    def sql_kpis_por_activo(cls, db_manager) -> Dict[int, Dict[str, Any]]:
+        """
+        Calcula los KPIs de todos los activos agrupando en SQLite.
+        
+        Pensado para tableros de toda la flota: dos consultas con GROUP BY en
+        lugar de llamar a sql_kpis_activo una vez por activo.
+        
+        Args:
+            db_manager: Instancia de DatabaseManager
+            
+        Returns:
+            Diccionario activo_id -> KPIs, con las mismas claves que
+            calcular_kpis_activo
+        """
+        return {
+            activo_id: cls.calcular_kpis_desde_agregados(agregados)
+            for activo_id, agregados in db_manager.kpis_por_activo().items()
+        }
+    
     @staticmethod
     def generar_reporte_estadistico(
         fallas: List[Dict[str, Any]], 
@@ -194,7 +293,7 @@ class KPICalculator:
                     continue
                     
                 try:
-                    fecha_falla = datetime.fromisoformat(falla['fecha_reporte'])
+                    fecha_falla = _como_datetime(falla['fecha_reporte'])
                     if (periodo_inicio and fecha_falla < periodo_inicio) or \
                        (periodo_fin and fecha_falla > periodo_fin):
                         continue
@@ -221,26 +320,20 @@ class KPICalculator:
             if f.get('costo_reparacion') is not None
         ]
         
-        # Agrupar por causa raíz (si existe el campo)
-        causas_raiz = {}
-        for falla in fallas_filtradas:
-            causa = falla.get('causa_raiz', 'No especificada')
-            causas_raiz[causa] = causas_raiz.get(causa, 0) + 1
-        
-        # Ordenar causas por frecuencia
-        causas_ordenadas = sorted(
-            causas_raiz.items(), 
-            key=lambda x: x[1], 
-            reverse=True
+        # Agrupar por causa raíz (si existe el campo); most_common conserva el
+        # orden de aparición entre causas con la misma frecuencia
+        causas_raiz = Counter(
+            falla.get('causa_raiz', 'No especificada') for falla in fallas_filtradas
         )
+        tiempo_total = sum(tiempos_reparacion)
         
         return {
             'periodo_inicio': periodo_inicio.isoformat() if periodo_inicio else None,
             'periodo_fin': periodo_fin.isoformat() if periodo_fin else None,
             'total_fallas': num_fallas,
-            'tiempo_promedio_reparacion': np.mean(tiempos_reparacion) if tiempos_reparacion else 0,
-            'tiempo_total_fuera_servicio': sum(tiempos_reparacion),
-            'costo_total_reparaciones': sum(costos_reparacion) if costos_reparacion else 0,
-            'causas_raiz': dict(causas_ordenadas[:5]),  # Top 5 causas
-            'distribucion_por_estado': dict(pd.Series([f.get('estado', 'Desconocido') for f in fallas_filtradas]).value_counts().head())
+            'tiempo_promedio_reparacion': tiempo_total / len(tiempos_reparacion) if tiempos_reparacion else 0,
+            'tiempo_total_fuera_servicio': tiempo_total,
+            'costo_total_reparaciones': sum(costos_reparacion),
+            'causas_raiz': dict(causas_raiz.most_common(5)),  # Top 5 causas
+            'distribucion_por_estado': dict(Counter(f.get('estado', 'Desconocido') for f in fallas_filtradas).most_common(5))
         }
@@ -0,0 +1,33 @@
+"""
+Configuración común de las pruebas.
+
+La aplicación de la raíz (app.py) y el paquete de src/ se importan sin
+instalar, por lo que ambos directorios se añaden a sys.path. La raíz va
+primero para que ``import app`` sea app.py y no src/app.py.
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+RAIZ = Path(__file__).resolve().parent.parent
+for ruta in (str(RAIZ / 'src'), str(RAIZ)):
+    if ruta in sys.path:
+        sys.path.remove(ruta)
+    sys.path.insert(0, ruta)
+
+
+@pytest.fixture
+def app_historial(tmp_path, monkeypatch):
+    """Aplicación de la raíz con su base de datos en un directorio temporal."""
+    # app.py crea la carpeta de subidas en el directorio actual al importarse
+    monkeypatch.chdir(tmp_path)
+    import app as modulo
+
+    monkeypatch.setattr(modulo, 'pool', modulo.PoolConexiones(str(tmp_path / 'mantenimiento.db')))
+    modulo.init_db()
+    modulo.cache.clear()
+    modulo.exportaciones.clear()
+    modulo.app.config['TESTING'] = True
+    return modulo
@@ -0,0 +1,62 @@
+"""Pruebas de la exportación a Excel en segundo plano."""
+
+import threading
+
+import pytest
+
+pytest.importorskip('openpyxl')
+
+
+def test_exportacion_pasa_de_202_a_200_y_304(app_historial, monkeypatch):
+    with app_historial.pool.acquire() as conn:
+        conn.execute(
+            "INSERT INTO mantenimiento (fecha, tipo, checklist, comentarios) VALUES ('2024-01-01', 'Preventivo', '', '')"
+        )
+
+    # Retener la generación hasta haber consultado el estado una vez
+    liberar = threading.Event()
+    generar_excel = app_historial.generar_excel
+
+    def generar_retenido(trabajo_id):
+        liberar.wait(timeout=10)
+        generar_excel(trabajo_id)
+
+    monkeypatch.setattr(app_historial, 'generar_excel', generar_retenido)
+    cliente = app_historial.app.test_client()
+
+    respuesta = cliente.get('/exportar-excel')
+    assert respuesta.status_code == 302
+    url_estado = respuesta.headers['Location']
+    trabajo_id = url_estado.rsplit('/', 1)[-1]
+
+    # Mientras se genera, la página de espera responde 202
+    respuesta = cliente.get(url_estado)
+    assert respuesta.status_code == 202
+    assert trabajo_id in respuesta.get_data(as_text=True)
+
+    liberar.set()
+    app_historial.exportaciones[trabajo_id].result(timeout=10)
+
+    respuesta = cliente.get(url_estado)
+    assert respuesta.status_code == 200
+    assert respuesta.mimetype == app_historial.XLSX_MIMETYPE
+    assert respuesta.data.startswith(b'PK')
+    etag = respuesta.headers['ETag']
+    assert trabajo_id not in app_historial.exportaciones
+
+    # Con el mismo historial, el navegador puede reutilizar su descarga
+    respuesta = cliente.get(url_estado, headers={'If-None-Match': etag})
+    assert respuesta.status_code == 304
+
+    respuesta = cliente.get('/exportar-excel', headers={'If-None-Match': etag})
+    assert respuesta.status_code == 304
+
+
+def test_nuevo_registro_cambia_el_trabajo(app_historial):
+    primera = app_historial.firma_historial()
+    with app_historial.pool.acquire() as conn:
+        conn.execute(
+            "INSERT INTO mantenimiento (fecha, tipo, checklist, comentarios) VALUES ('2024-01-02', 'Correctivo', '', '')"
+        )
+
+    assert app_historial.firma_historial() != primera
@@ -0,0 +1,78 @@
+"""Pruebas de la paginación por clave del historial de mantenimiento."""
+
+import re
+
+import pytest
+
+
+def insertar_registros(modulo, fechas):
+    with modulo.pool.acquire() as conn:
+        conn.executemany(
+            "INSERT INTO mantenimiento (fecha, tipo, checklist, comentarios) VALUES (?, 'Preventivo', '', '')",
+            [(fecha,) for fecha in fechas]
+        )
+
+
+def ids_en_pagina(html):
+    return [int(i) for i in re.findall(r'<td>(\d+)</td>', html)]
+
+
+def enlace_siguiente(html):
+    coincidencia = re.search(r'href="([^"]*desde_id=[^"]*)"', html)
+    return coincidencia.group(1).replace('&amp;', '&') if coincidencia else None
+
+
+@pytest.mark.parametrize('limite, esperado', [(-1, 1), (0, 1), (3, 3), (1000, 500)])
+def test_limite_se_acota(app_historial, limite, esperado):
+    insertar_registros(app_historial, [f'2024-01-{dia:02d}' for dia in range(1, 11)])
+    respuesta = app_historial.app.test_client().get(f'/historial?limite={limite}')
+
+    assert respuesta.status_code == 200
+    html = respuesta.get_data(as_text=True)
+    assert len(ids_en_pagina(html)) == min(esperado, 10)
+
+
+def test_limite_no_numerico_usa_el_valor_por_defecto(app_historial):
+    insertar_registros(app_historial, ['2024-01-01'])
+    respuesta = app_historial.app.test_client().get('/historial?limite=abc')
+
+    assert respuesta.status_code == 200
+    assert ids_en_pagina(respuesta.get_data(as_text=True)) == [1]
+
+
+def test_recorrido_por_paginas_hasta_la_ultima(app_historial):
+    # Dos registros comparten fecha: el id desempata el orden
+    insertar_registros(app_historial, ['2024-01-01', '2024-01-02', '2024-01-02', '2024-01-03', '2024-01-04'])
+    cliente = app_historial.app.test_client()
+
+    vistos = []
+    url = '/historial?limite=2'
+    for _ in range(5):
+        html = cliente.get(url).get_data(as_text=True)
+        vistos.extend(ids_en_pagina(html))
+        url = enlace_siguiente(html)
+        if url is None:
+            break
+
+    # Orden (fecha DESC, id DESC) sin repetidos ni huecos; la última página
+    # tiene menos filas que el límite y no enlaza a una siguiente
+    assert vistos == [5, 4, 3, 2, 1]
+    assert url is None
+
+
+def test_cursor_no_valido_vuelve_a_la_primera_pagina(app_historial):
+    insertar_registros(app_historial, ['2024-01-01', '2024-01-02', '2024-01-03'])
+    cliente = app_historial.app.test_client()
+
+    respuesta = cliente.get('/historial?limite=2&desde_fecha=2024-01-02&desde_id=abc')
+
+    assert respuesta.status_code == 200
+    assert ids_en_pagina(respuesta.get_data(as_text=True)) == [3, 2]
+
+
+def test_iterar_historial_continua_tras_el_cursor(app_historial):
+    insertar_registros(app_historial, ['2024-01-01', '2024-01-02', '2024-01-02', '2024-01-03'])
+
+    pagina = list(app_historial.iterar_historial(10, '2024-01-02', 3))
+
+    assert [fila[0] for fila in pagina] == [2, 1]
@@ -0,0 +1,97 @@
+"""Pruebas de equivalencia entre los KPIs calculados en SQL y en Python."""
+
+import pytest
+
+from mantenimiento.models.activo import Activo
+from mantenimiento.models.falla import EstadoFalla, Falla
+from mantenimiento.models.orden_trabajo import EstadoOrden, OrdenTrabajo, TipoOrden
+from mantenimiento.utils.data_loader import DataLoader
+from mantenimiento.utils.database import DatabaseManager
+from mantenimiento.utils.kpi_calculator import KPICalculator
+
+
+@pytest.fixture
+def db_manager(tmp_path):
+    db = DatabaseManager(str(tmp_path / 'kpis.db'))
+    db._create_tables()
+    yield db
+    db.close_connection()
+
+
+def falla(falla_id, activo_id, fecha, estado=EstadoFalla.RESUELTA, horas=None):
+    return Falla(
+        falla_id=falla_id, activo_id=activo_id, fecha_reporte=fecha,
+        descripcion='Falla', reportada_por='Operador', estado=estado,
+        tiempo_fuera_servicio_h=horas
+    )
+
+
+def orden(ot_id, activo_id, tipo, programada, fin=None, estado=EstadoOrden.COMPLETADA, costo=None):
+    return OrdenTrabajo(
+        ot_id=ot_id, activo_id=activo_id, tipo=tipo, fecha_creacion='2024-01-01',
+        fecha_programada=programada, descripcion='Orden', tecnico_asignado='Técnico',
+        fecha_fin=fin, estado=estado, costo_real=costo
+    )
+
+
+def kpis_en_python(db_manager, activo_id):
+    fallas = db_manager.execute_query("SELECT * FROM fallas WHERE activo_id = ?", (activo_id,))
+    ordenes = db_manager.execute_query("SELECT * FROM ordenes_trabajo WHERE activo_id = ?", (activo_id,))
+    return KPICalculator.calcular_kpis_activo(
+        [dict(f) for f in fallas], [dict(o) for o in ordenes]
+    )
+
+
+def comparar(sql, python):
+    sql.pop('ultima_actualizacion')
+    python.pop('ultima_actualizacion')
+    assert sql.keys() == python.keys()
+    for clave, valor in python.items():
+        assert sql[clave] == pytest.approx(valor), clave
+
+
+def test_kpis_sql_equivalen_a_los_de_python(db_manager):
+    DataLoader.insertar_en_bd([
+        Activo(1, 'Bomba', 'Alta', '2023-01-01', 'Planta', 'Ana'),
+        Activo(2, 'Motor', 'Media', '2023-01-01', 'Planta', 'Luis'),
+        Activo(3, 'Sin historial', 'Baja', '2023-01-01', 'Planta', 'Eva'),
+        # Fechas sin ordenar, con y sin hora, y una falla no resuelta
+        falla(1, 1, '2024-03-01T08:00:00', horas=4.0),
+        falla(2, 1, '2024-01-01', horas=2.0),
+        falla(3, 1, '2024-02-15T20:30:00', estado=EstadoFalla.CERRADA),
+        falla(4, 1, '2024-04-01T00:00:00', estado=EstadoFalla.REPORTADA, horas=50.0),
+        falla(5, 2, '2024-05-05T05:00:00', horas=1.5),
+        orden(1, 1, TipoOrden.PREVENTIVO, '2024-01-10', fin='2024-01-10T16:00:00', costo=100.0),
+        orden(2, 1, TipoOrden.PREVENTIVO, '2024-02-10', fin='2024-02-15', costo=50.5),
+        orden(3, 1, TipoOrden.PREVENTIVO, '2024-03-10', estado=EstadoOrden.PENDIENTE),
+        orden(4, 1, TipoOrden.CORRECTIVO, '2024-03-01', fin='2024-03-02', costo=300.0),
+        orden(5, 2, TipoOrden.CORRECTIVO, '2024-05-05', fin='2024-05-06'),
+    ], db_manager)
+
+    for activo_id in (1, 2, 3):
+        comparar(
+            KPICalculator.sql_kpis_activo(db_manager, activo_id),
+            kpis_en_python(db_manager, activo_id)
+        )
+
+    # La versión agrupada coincide con la de un activo; los activos sin
+    # fallas ni órdenes no aparecen
+    por_activo = KPICalculator.sql_kpis_por_activo(db_manager)
+    assert sorted(por_activo) == [1, 2]
+    for activo_id, kpis in por_activo.items():
+        comparar(kpis, kpis_en_python(db_manager, activo_id))
+
+
+def test_mtbf_usa_la_primera_y_la_ultima_falla(db_manager):
+    DataLoader.insertar_en_bd([
+        Activo(1, 'Bomba', 'Alta', '2023-01-01', 'Planta', 'Ana'),
+        falla(1, 1, '2024-01-01T00:00:00'),
+        falla(2, 1, '2024-01-02T00:00:00'),
+        falla(3, 1, '2024-01-05T00:00:00'),
+    ], db_manager)
+
+    kpis = KPICalculator.sql_kpis_activo(db_manager, 1)
+
+    assert kpis['num_intervalos_mtbf'] == 2
+    assert kpis['mtbf_horas'] == pytest.approx(48.0)
+    assert kpis_en_python(db_manager, 1)['mtbf_horas'] == pytest.approx(48.0)